@@ -0,0 +1,84 @@
+"""
+Programmatic entry points for scripts, cron jobs and workers.
+
+Nothing here imports Streamlit. The Groq client, chromadb and the
+embedding model are loaded on first use through CMGresources, so a call
+that does not need them (extracting a JSON-LD page, writing an email
+without portfolio matching) never imports them.
+"""
+import os
+
+import CMGtrace as trace
+from CMGresources import LazyChain, get_chain, get_fetcher, get_portfolio, get_store
+from CMGskills import split_skills
+from CMGutils import clean_text
+
+DEFAULT_PORTFOLIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Resource", "my_portfolio.csv")
+
+
+def extract_jobs(url, refresh=False, use_cache=True):
+    """Job dicts for the postings at `url`, from the job store when the page has not changed"""
+    from CMGextract import load_posting
+
+    with trace.request():
+        html = get_fetcher().fetch(url)
+        # The chain is only built if the page needs the LLM
+        _, rows = load_posting(html, url, get_store(), LazyChain(), clean_text, refresh=refresh, use_cache=use_cache)
+    return [row["job"] for row in rows]
+
+
+def match_links(job, portfolio_csv=DEFAULT_PORTFOLIO, n_results=3):
+    """Portfolio links for a job's skills"""
+    portfolio = get_portfolio(portfolio_csv)
+    return portfolio.query_links(split_skills(job.get("skills") or []), n_results=n_results)
+
+
+def write_email(job, links=None, portfolio_csv=DEFAULT_PORTFOLIO, use_cache=True):
+    """
+    Write a cold email for one job dict (or raw job description string)
+
+    Links are matched from the portfolio unless given; pass
+    `portfolio_csv=None` to skip matching and use the default portfolio link.
+    """
+    with trace.request():
+        if links is None and portfolio_csv is not None and isinstance(job, dict):
+            links = match_links(job, portfolio_csv)
+        return get_chain().write_mail(job, links, use_cache=use_cache)
+
+
+def write_variants(job, n=3, links=None, portfolio_csv=DEFAULT_PORTFOLIO, use_cache=None, **variant_kwargs):
+    """
+    Write `n` emails for one job in parallel with different temperatures and
+    tones, best first (see Chain.write_variants for the options)
+    """
+    with trace.request():
+        if links is None and portfolio_csv is not None and isinstance(job, dict):
+            links = match_links(job, portfolio_csv)
+        return get_chain().write_variants(job, n, links=links, use_cache=use_cache, **variant_kwargs)
+
+
+def generate(url, portfolio_csv=DEFAULT_PORTFOLIO, refresh=False, use_cache=True):
+    """Extract the jobs at `url` and write an email for each; returns dicts with job, links and email"""
+    results = []
+    # One request id for the page and every email written for it
+    with trace.request():
+        for job in extract_jobs(url, refresh=refresh, use_cache=use_cache):
+            links = match_links(job, portfolio_csv) if portfolio_csv is not None else None
+            results.append({"job": job, "links": links, "email": write_email(job, links, None, use_cache)})
+    return results
+
+
+def index_portfolio(portfolio_csv=DEFAULT_PORTFOLIO):
+    """Sync the portfolio vector store with the CSV; returns the added/deleted counts and the collection size"""
+    portfolio = get_portfolio(portfolio_csv)
+    portfolio.load_portfolio()
+    return dict(portfolio.last_sync, total=portfolio.collection.count())
+
+
+def run_batch(urls, portfolio_csv=DEFAULT_PORTFOLIO, **runner_kwargs):
+    """Yield one result dict per URL as the batch runner finishes it (see CMGbatch.BatchRunner)"""
+    from CMGbatch import BatchRunner
+
+    portfolio = get_portfolio(portfolio_csv) if portfolio_csv is not None else None
+    runner = BatchRunner(get_chain(), portfolio, fetcher=get_fetcher(), store=get_store(), **runner_kwargs)
+    return runner.iter_results(list(urls))
@@ -1,28 +1,28 @@
 import streamlit as st
 from CMGutils import clean_text
-from CMGchain import Chain
-from CMGportfolio import Portfolio
+from CMGresources import get_chain, get_portfolio
 import os
 
 st.title("Cold Email Generator")
 
-# Load CSV and portfolio
+# Load CSV and portfolio (shared across reruns, rebuilt only when the CSV changes)
 csv_path = os.path.join(os.path.dirname(__file__), "Resource", "my_portfolio.csv")
-portfolio = Portfolio(csv_path)
-chain = Chain()
+portfolio = get_portfolio(csv_path)
+chain = get_chain()
 
 # Input job description
 job_desc = st.text_area("Paste Job Description Here", height=300)
 
 # Choose a project
-options = [f"{p['Techstack']} — {p['Links']}" for p in portfolio.projects]
+projects = portfolio.data.to_dict("records")
+options = [f"{p['Techstack']} — {p['Links']}" for p in projects]
 selected = st.selectbox("Select a project to include", options)
 
 # Extract selected link
-selected_link = portfolio.projects[options.index(selected)]['Links']
+selected_link = projects[options.index(selected)]['Links']
 
 if st.button("Generate Cold Email"):
     cleaned = clean_text(job_desc)
-    email = chain.write_email([cleaned], selected_link)
+    email = chain.write_mail(cleaned, selected_link)
     st.subheader("📧 Generated Cold Email")
-    st.write(email[0])
+    st.write(email)
@@ -0,0 +1,240 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import CMGtrace as trace
+from CMGextract import load_jobs, load_posting
+from CMGscheduler import BATCH
+from CMGskills import split_skills
+from CMGutils import clean_text as default_clean_text
+
+
+def read_urls(lines):
+    """Return the non-empty, non-comment URLs from an iterable of lines, de-duplicated in order"""
+    seen = set()
+    urls = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="ignore")
+        url = line.strip()
+        if not url or url.startswith("#") or url in seen:
+            continue
+        seen.add(url)
+        urls.append(url)
+    return urls
+
+
+def write_jsonl(results, fp):
+    """Write each result as one JSON line as soon as it arrives"""
+    count = 0
+    for result in results:
+        fp.write(json.dumps(result, ensure_ascii=False) + "\n")
+        fp.flush()
+        count += 1
+    return count
+
+
+def _traced(request_id, func, *args):
+    # Executor threads do not inherit the loop's context, so the request id is passed explicitly
+    with trace.request(request_id):
+        return func(*args)
+
+
+class BatchRunner:
+    """
+    Generate cold emails for many job URLs.
+
+    Pages are fetched concurrently on an asyncio loop, with at most
+    `per_host_limit` requests in flight per host and `fetch_limit` overall.
+    Fetched pages go through a bounded queue to `workers` threads that run
+    extraction and email writing, so fetching pauses when the workers fall
+    behind. Results are yielded as soon as each posting finishes. With a
+    `store`, pages extracted before are not extracted again and every
+    generated email is saved.
+    """
+
+    def __init__(self, llm, portfolio=None, clean_text=default_clean_text, fetcher=None,
+                 per_host_limit=2, fetch_limit=16, workers=4, queue_size=None, store=None):
+        if fetcher is None:
+            from CMGfetch import PageFetcher
+            fetcher = PageFetcher(pool_size=fetch_limit)
+        self.llm = llm
+        self.fetcher = fetcher
+        self.portfolio = portfolio
+        self.clean_text = clean_text
+        self.store = store
+        self.per_host_limit = max(1, per_host_limit)
+        self.fetch_limit = max(1, fetch_limit)
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 2
+
+    def _load_page(self, url):
+        return self.fetcher.fetch(url)
+
+    def _process_page(self, url, html):
+        results = []
+        # Batch work yields to interactive requests in the LLM scheduler
+        if self.store is not None:
+            _, rows = load_posting(html, url, self.store, self.llm, self.clean_text, priority=BATCH)
+            jobs = [(row["id"], row["job"]) for row in rows]
+        else:
+            jobs = [(None, job) for job in load_jobs(html, self.llm, self.clean_text, priority=BATCH)]
+        for job_id, job in jobs:
+            if self.portfolio is not None:
+                links = self.portfolio.query_links(split_skills(job.get('skills') or []))
+            else:
+                links = None
+            email = self.llm.write_mail(job, links, priority=BATCH)
+            if job_id is not None:
+                self.store.save_email(job_id, email, links)
+            results.append({"job": job, "links": links, "email": email})
+        return results
+
+    async def _fetch(self, url, host_limits, fetch_limit, pages, loop, pool):
+        host = urlparse(url).netloc.lower()
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        started = time.perf_counter()
+        # One request id covers fetching, extracting and writing for this URL
+        request_id = trace.new_request_id()
+        async with fetch_limit:
+            try:
+                async with host_limits[host]:
+                    html = await loop.run_in_executor(pool, _traced, request_id, self._load_page, url)
+                error = None
+            except Exception as e:
+                html, error = None, f"Fetch failed: {e}"
+            # Hold the fetch slot until the page is queued so a slow worker
+            # pool stops new downloads instead of buffering pages in memory
+            await pages.put((url, html, error, started, request_id))
+
+    async def _work(self, pages, results, loop, pool):
+        while True:
+            item = await pages.get()
+            if item is None:
+                pages.task_done()
+                return
+            url, html, error, started, request_id = item
+            result = {"url": url, "status": "error", "jobs": [], "error": error}
+            if request_id is not None:
+                result["request_id"] = request_id
+            if error is None:
+                try:
+                    result["jobs"] = await loop.run_in_executor(pool, _traced, request_id,
+                                                                self._process_page, url, html)
+                    result["status"] = "ok"
+                except Exception as e:
+                    result["error"] = str(e)
+            result["elapsed"] = round(time.perf_counter() - started, 3)
+            await results.put(result)
+            pages.task_done()
+
+    async def arun(self, urls):
+        """Async generator yielding one result dict per URL in completion order"""
+        if self.portfolio is not None:
+            self.portfolio.load_portfolio()
+
+        loop = asyncio.get_running_loop()
+        pages = asyncio.Queue(maxsize=self.queue_size)
+        results = asyncio.Queue()
+        host_limits = {}
+        fetch_limit = asyncio.Semaphore(self.fetch_limit)
+
+        with ThreadPoolExecutor(max_workers=self.fetch_limit, thread_name_prefix="cmg-fetch") as fetch_pool, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cmg-work") as work_pool:
+            fetchers = [asyncio.create_task(self._fetch(url, host_limits, fetch_limit, pages, loop, fetch_pool))
+                        for url in urls]
+            workers = [asyncio.create_task(self._work(pages, results, loop, work_pool))
+                       for _ in range(self.workers)]
+
+            async def close_workers():
+                await asyncio.gather(*fetchers)
+                for _ in workers:
+                    await pages.put(None)
+
+            closer = asyncio.create_task(close_workers())
+            try:
+                for _ in range(len(urls)):
+                    yield await results.get()
+            finally:
+                for task in fetchers + workers + [closer]:
+                    task.cancel()
+                await asyncio.gather(*fetchers, *workers, closer, return_exceptions=True)
+
+    def iter_results(self, urls):
+        """Synchronous generator over `arun`, for callers without an event loop (CLI, Streamlit)"""
+        out = queue.Queue()
+        done = object()
+        stop = threading.Event()
+
+        async def pump():
+            agen = self.arun(urls)
+            try:
+                async for result in agen:
+                    out.put(result)
+                    if stop.is_set():
+                        break
+            finally:
+                await agen.aclose()
+
+        def run():
+            try:
+                asyncio.run(pump())
+            except Exception as e:
+                out.put(e)
+            finally:
+                out.put(done)
+
+        thread = threading.Thread(target=run, name="cmg-batch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = out.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate cold emails for a file of job URLs")
+    parser.add_argument("urls", help="File with one URL per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file ('-' for stdout)")
+    parser.add_argument("--per-host", type=int, default=2, help="Concurrent fetches per host")
+    parser.add_argument("--fetch-limit", type=int, default=16, help="Concurrent fetches overall")
+    parser.add_argument("--workers", type=int, default=4, help="Extraction/email worker threads")
+    parser.add_argument("--portfolio", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "Resource", "my_portfolio.csv"))
+    args = parser.parse_args(argv)
+
+    from CMGresources import get_chain, get_portfolio, get_store
+
+    if args.urls == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.urls, encoding="utf-8") as f:
+            urls = read_urls(f)
+
+    runner = BatchRunner(get_chain(), get_portfolio(args.portfolio), per_host_limit=args.per_host,
+                         fetch_limit=args.fetch_limit, workers=args.workers, store=get_store())
+    if args.output == "-":
+        count = write_jsonl(runner.iter_results(urls), sys.stdout)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            count = write_jsonl(runner.iter_results(urls), f)
+    print(f"Processed {count} URL(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
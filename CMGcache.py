@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import CMGtrace as trace
+
+
+def default_cache_dir():
+    return os.getenv("CMG_CACHE_DIR", os.path.join(os.getcwd(), ".cache"))
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache for LLM responses.
+
+    Entries live in a small SQLite file keyed by a hash of the model, the
+    prompt template and the input variables. Entries older than `ttl`
+    seconds are treated as misses, and once more than `max_entries` are
+    stored the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=None, ttl=7 * 24 * 3600, max_entries=5000, enabled=True):
+        if path is None:
+            cache_dir = default_cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "responses.sqlite3")
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled and os.getenv("CMG_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, template, variables):
+        payload = json.dumps(
+            {"model": model, "template": template, "variables": variables},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                trace.inc("cmg_cache_requests_total", cache="response", result="miss")
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        trace.inc("cmg_cache_requests_total", cache="response", result="hit")
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def get_or_compute(self, key, compute, bypass=False):
+        """Return the cached value for `key`, calling `compute()` and storing its result on a miss"""
+        if not bypass:
+            value = self.get(key)
+            if value is not None:
+                return value
+        value = compute()
+        self.set(key, value)
+        return value
+
+    async def aget_or_compute(self, key, acompute, bypass=False):
+        """`get_or_compute` for a coroutine function; lookups are local SQLite reads and do not await"""
+        if not bypass:
+            value = self.get(key)
+            if value is not None:
+                return value
+        value = await acompute()
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -1,26 +1,25 @@
+import asyncio
+import contextvars
 import os
-from langchain_groq import ChatGroq
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import ConfigurableField, RunnableLambda
 from dotenv import load_dotenv
 
-load_dotenv()
-
+import CMGtrace as trace
+from CMGcache import ResponseCache
+from CMGscheduler import INTERACTIVE, LLMScheduler
+from CMGutils import estimate_tokens, split_text, trim_to_tokens
+from CMGvariants import TONES, VARIANT_TEMPERATURES, rank_variants, score_email
 
-class Chain:
-    def __init__(self):
-        self.llm = ChatGroq(
-            temperature=0,
-            groq_api_key=os.getenv("GROQ_API_KEY"),
-            model_name="llama-3.1-8b-instant"
-        )
-        # Your portfolio link
-        self.portfolio_link = "https://anup2003d.github.io/portfolio-site/"
+load_dotenv()
 
-    def extract_jobs(self, cleaned_text):
-        prompt_extract = PromptTemplate.from_template(
-            """
+EXTRACT_TEMPLATE = """
             ### SCRAPED TEXT FROM WEBSITE:
 {page_data}
 
@@ -39,66 +38,8 @@ If any field is not found, use "Not specified" as the value.
 
 ### VALID JSON (NO PREAMBLE):
             """
-        )
-        chain_extract = prompt_extract | self.llm
-        res = chain_extract.invoke(input={"page_data": cleaned_text})
-        try:
-            json_parser = JsonOutputParser()
-            res = json_parser.parse(res.content)
-        except OutputParserException:
-            raise OutputParserException("Context too big. Unable to parse jobs.")
-        return res if isinstance(res, list) else [res]
-
-    def _detect_role_level(self, job_data):
-        """Detect the seniority level of the role to adjust positioning"""
-        if isinstance(job_data, dict):
-            role = job_data.get('role', '').lower()
-            description = job_data.get('description', '').lower()
-            experience = job_data.get('experience', '').lower()
-        else:
-            role = str(job_data).lower()
-            description = role
-            experience = role
-
-        # Check for role level indicators
-        if any(word in role or word in description for word in ['intern', 'internship', 'trainee']):
-            return 'internship'
-        elif any(word in role or word in description for word in
-                 ['junior', 'entry', 'associate', '0-2 years', 'fresher']):
-            return 'junior'
-        elif any(word in role or word in description for word in
-                 ['senior', 'lead', 'principal', '5+ years', 'experienced']):
-            return 'senior'
-        else:
-            return 'mid'  # Default to mid-level
-
-    def write_mail(self, job, links=None):
-        # Use provided links or default to your portfolio
-        if links is None:
-            links = [self.portfolio_link]
-        elif isinstance(links, str):
-            links = [links]
-
-        # Extract company name from job data or use default
-        company_name = job.get('company_name', 'the company') if isinstance(job, dict) else 'the company'
 
-        # Detect role level for appropriate positioning
-        role_level = self._detect_role_level(job)
-
-        # Format job description properly
-        job_description = str(job) if not isinstance(job, dict) else f"""
-Role: {job.get('role', 'Not specified')}
-Experience: {job.get('experience', 'Not specified')}
-Skills: {job.get('skills', 'Not specified')}
-Description: {job.get('description', 'Not specified')}
-Requirements: {job.get('requirements', 'Not specified')}
-Company Challenges: {job.get('company_challenges', 'Not specified')}
-Preferred Skills: {job.get('preferred_skills', 'Not specified')}
-Role Level Detected: {role_level}
-        """
-
-        prompt_email = PromptTemplate.from_template(
-            """
+EMAIL_TEMPLATE = """
             ### JOB DESCRIPTION:
 {job_description}
 
@@ -191,29 +132,525 @@ LinkedIn: linkedin.com/in/anup-data-analyst
 
 ############# EMAIL (NO PREAMBLE):
             """
-        )
 
-        chain_email = prompt_email | self.llm
-        res = chain_email.invoke({
+
+# The email prompt with a tone instruction, for writing several variants of one email
+EMAIL_VARIANT_TEMPLATE = EMAIL_TEMPLATE.replace("### OUTPUT FORMAT:", "### TONE:\n{tone}\n\n### OUTPUT FORMAT:", 1)
+
+# Parsed once; a prompt template is immutable and safe to share between threads
+EXTRACT_PROMPT = PromptTemplate.from_template(EXTRACT_TEMPLATE)
+EMAIL_PROMPT = PromptTemplate.from_template(EMAIL_TEMPLATE)
+EMAIL_VARIANT_PROMPT = PromptTemplate.from_template(EMAIL_VARIANT_TEMPLATE)
+
+NOT_SPECIFIED = "Not specified"
+# Completion allowance added to the prompt size when reserving tokens with the scheduler
+EXTRACT_OUTPUT_TOKENS = 800
+EMAIL_OUTPUT_TOKENS = 500
+# Default size limit for the job description block of the email prompt
+EMAIL_JOB_TOKENS = int(os.getenv("CMG_EMAIL_JOB_TOKENS", 600))
+# Job fields shown in the email prompt, in order; fields without information are left out
+EMAIL_JOB_FIELDS = [
+    ("role", "Role"),
+    ("experience", "Experience"),
+    ("skills", "Skills"),
+    ("description", "Description"),
+    ("requirements", "Requirements"),
+    ("company_challenges", "Company Challenges"),
+    ("preferred_skills", "Preferred Skills"),
+]
+# Longest fields, trimmed when the job block is over budget
+TRIMMED_FIELDS = ("description", "requirements")
+
+
+def _is_specified(value):
+    if isinstance(value, (list, tuple)):
+        return any(_is_specified(v) for v in value)
+    return bool(value) and str(value).strip().lower() not in ("", "not specified", "n/a", "none")
+
+
+def _normalize(value):
+    return " ".join(str(value).lower().split()) if _is_specified(value) else ""
+
+
+def _as_list(value):
+    return list(value) if isinstance(value, (list, tuple)) else [s.strip() for s in str(value).split(',')]
+
+
+def _merge_values(field, current, new):
+    if not _is_specified(current):
+        return new
+    if not _is_specified(new):
+        return current
+    if field in ('skills', 'preferred_skills') or isinstance(current, list) or isinstance(new, list):
+        items = _as_list(current)
+        seen = {_normalize(item) for item in items}
+        items += [item for item in _as_list(new) if _normalize(item) not in seen]
+        return items if isinstance(current, list) else ", ".join(items)
+    return current if len(str(current)) >= len(str(new)) else new
+
+
+def merge_jobs(jobs):
+    """
+    Merge job dicts extracted from overlapping chunks of one page
+
+    Jobs with the same role are merged when their companies match or one of
+    them has no company, and jobs with no specified fields are dropped.
+    """
+    merged = []
+    for job in jobs:
+        if not isinstance(job, dict) or not any(_is_specified(v) for v in job.values()):
+            continue
+        role = _normalize(job.get('role'))
+        company = _normalize(job.get('company_name'))
+        for existing in merged:
+            existing_company = _normalize(existing.get('company_name'))
+            if role and _normalize(existing.get('role')) == role and \
+                    (not company or not existing_company or company == existing_company):
+                for field, value in job.items():
+                    existing[field] = _merge_values(field, existing.get(field, NOT_SPECIFIED), value)
+                break
+        else:
+            merged.append(dict(job))
+    return merged
+
+
+def _parse_jobs(content):
+    try:
+        jobs = JsonOutputParser().parse(content)
+    except OutputParserException:
+        raise OutputParserException("Context too big. Unable to parse jobs.")
+    return jobs if isinstance(jobs, list) else [jobs]
+
+
+def _combine_chunks(results):
+    """Merge the job lists (or exceptions) of a page's chunks"""
+    jobs = []
+    failures = 0
+    for result in results:
+        if isinstance(result, OutputParserException):
+            # Navigation or footer chunks often have nothing parseable
+            failures += 1
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            jobs.extend(result)
+    if failures == len(results):
+        raise OutputParserException("Unable to parse jobs from any part of the page.")
+    return merge_jobs(jobs)
+
+
+def _configurable_temperature(llm):
+    """`llm` with its temperature settable per call, or unchanged if the model has no temperature field"""
+    if "temperature" not in getattr(type(llm), "model_fields", {}):
+        return llm
+    return llm.configurable_fields(temperature=ConfigurableField(id="temperature", name="LLM temperature"))
+
+
+class UsageLog:
+    """Token counts and latency of recent LLM requests, so cost and speed per email can be tracked"""
+
+    def __init__(self, max_records=1000):
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def record(self, kind, prompt_tokens, completion_tokens, latency, cached=False):
+        entry = {
+            "kind": kind,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "latency": round(latency, 4),
+            "cached": cached,
+        }
+        with self._lock:
+            self.records.append(entry)
+        return entry
+
+    def summary(self):
+        """Per request kind: requests, cache hits, total tokens and mean latency of the recorded requests"""
+        with self._lock:
+            records = list(self.records)
+        summary = {}
+        for entry in records:
+            kind = summary.setdefault(entry["kind"], {"requests": 0, "cached": 0, "prompt_tokens": 0,
+                                                      "completion_tokens": 0, "latency": 0.0})
+            kind["requests"] += 1
+            kind["cached"] += entry["cached"]
+            kind["prompt_tokens"] += entry["prompt_tokens"]
+            kind["completion_tokens"] += entry["completion_tokens"]
+            kind["latency"] += entry["latency"]
+        for kind in summary.values():
+            kind["mean_latency"] = round(kind.pop("latency") / kind["requests"], 4)
+        return summary
+
+
+class Chain:
+    def __init__(self, cache=None, chunk_tokens=3000, max_workers=4, llm=None, scheduler=None,
+                 email_job_tokens=EMAIL_JOB_TOKENS):
+        self.model_name = getattr(llm, "model_name", None) or "llama-3.1-8b-instant"
+        self.temperature = getattr(llm, "temperature", 0) if llm is not None else 0
+        if llm is None:
+            # Imported here so tools that never call Groq do not pay for loading its client
+            from langchain_groq import ChatGroq
+            # Retries are owned by the scheduler, so the client itself does not retry
+            llm = ChatGroq(
+                temperature=self.temperature,
+                groq_api_key=os.getenv("GROQ_API_KEY"),
+                model_name=self.model_name,
+                max_retries=0
+            )
+        self.llm = llm
+        # Every LLM call goes through the scheduler for rate limits, concurrency and retries
+        self.scheduler = scheduler if scheduler is not None else LLMScheduler.from_env()
+        # Your portfolio link
+        self.portfolio_link = "https://anup2003d.github.io/portfolio-site/"
+        # Identical prompts at temperature 0 give identical answers, so reuse them
+        self.cache = cache if cache is not None else ResponseCache()
+        # Pages longer than this are split and the chunks extracted in parallel
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        # Token budget for the job description block of each email prompt
+        self.email_job_tokens = email_job_tokens
+        self.extract_chain = EXTRACT_PROMPT | self.llm
+        self.email_chain = EMAIL_PROMPT | self.llm
+        # Variants pick their own temperature through the run config
+        self.variant_chain = EMAIL_VARIANT_PROMPT | _configurable_temperature(self.llm)
+        self.usage = UsageLog()
+
+    def _cache_key(self, template, variables):
+        return self.cache.make_key(f"{self.model_name}@{self.temperature}", template, variables)
+
+    def _record_usage(self, kind, prompt_tokens, started, result=None, text=""):
+        """Log one request; `result` is the model's message, or None when the answer came from the cache"""
+        if result is None:
+            trace.inc("cmg_llm_requests_total", kind=kind, cached="true")
+            return self.usage.record(kind, 0, 0, time.perf_counter() - started, cached=True)
+        usage = getattr(result, "usage_metadata", None) or {}
+        entry = self.usage.record(kind, usage.get("input_tokens") or prompt_tokens,
+                                  usage.get("output_tokens") or estimate_tokens(text),
+                                  time.perf_counter() - started)
+        trace.inc("cmg_llm_requests_total", kind=kind, cached="false")
+        trace.inc("cmg_llm_tokens_total", entry["prompt_tokens"], kind=kind, type="prompt")
+        trace.inc("cmg_llm_tokens_total", entry["completion_tokens"], kind=kind, type="completion")
+        trace.observe("cmg_llm_latency_seconds", entry["latency"], kind=kind)
+        return entry
+
+    def extract_jobs(self, cleaned_text, use_cache=True, priority=INTERACTIVE):
+        chunks = split_text(cleaned_text, self.chunk_tokens)
+        with trace.span("extract", chunks=len(chunks)) as stage:
+            if len(chunks) == 1:
+                jobs = self._extract_chunk(cleaned_text, use_cache, priority)
+            else:
+                jobs = self._extract_chunks(chunks, use_cache, priority)
+            stage.set(jobs=len(jobs))
+        return jobs
+
+    def _extract_chunks(self, chunks, use_cache=True, priority=INTERACTIVE):
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as pool:
+            # Each chunk runs in a copy of the caller's context so its spans keep the request id
+            futures = [pool.submit(contextvars.copy_context().run, self._extract_chunk, chunk, use_cache, priority)
+                       for chunk in chunks]
+        return _combine_chunks([future.exception() or future.result() for future in futures])
+
+    def _extract_chunk(self, cleaned_text, use_cache=True, priority=INTERACTIVE):
+        prompt_tokens = estimate_tokens(EXTRACT_TEMPLATE + cleaned_text)
+        started = time.perf_counter()
+        responses = []
+
+        def compute():
+            res = self.scheduler.run(
+                lambda: self.extract_chain.invoke(input={"page_data": cleaned_text}),
+                priority=priority,
+                tokens=prompt_tokens + EXTRACT_OUTPUT_TOKENS
+            )
+            responses.append(res)
+            return _parse_jobs(res.content)
+
+        key = self._cache_key(EXTRACT_TEMPLATE, {"page_data": cleaned_text})
+        try:
+            jobs = self.cache.get_or_compute(key, compute, bypass=not use_cache)
+        except OutputParserException:
+            # The tokens were spent even though the answer was unusable
+            if responses:
+                self._record_usage("extract", prompt_tokens, started, responses[-1], responses[-1].content)
+            raise
+        response = responses[-1] if responses else None
+        self._record_usage("extract", prompt_tokens, started, response,
+                           response.content if response is not None else "")
+        return jobs
+
+    async def aextract_jobs(self, cleaned_text, use_cache=True, priority=INTERACTIVE):
+        """`extract_jobs` for asyncio: chunks are extracted concurrently on the event loop, holding no threads"""
+        # Splitting a long page is CPU work; keep it off the event loop
+        chunks = await asyncio.to_thread(split_text, cleaned_text, self.chunk_tokens)
+        with trace.span("extract", chunks=len(chunks)) as stage:
+            if len(chunks) == 1:
+                jobs = await self._aextract_chunk(cleaned_text, use_cache, priority)
+            else:
+                results = await asyncio.gather(*(self._aextract_chunk(chunk, use_cache, priority)
+                                                 for chunk in chunks), return_exceptions=True)
+                jobs = _combine_chunks(results)
+            stage.set(jobs=len(jobs))
+        return jobs
+
+    async def _aextract_chunk(self, cleaned_text, use_cache=True, priority=INTERACTIVE):
+        prompt_tokens = estimate_tokens(EXTRACT_TEMPLATE + cleaned_text)
+        started = time.perf_counter()
+        responses = []
+
+        async def compute():
+            res = await self.scheduler.arun(
+                lambda: self.extract_chain.ainvoke(input={"page_data": cleaned_text}),
+                priority=priority,
+                tokens=prompt_tokens + EXTRACT_OUTPUT_TOKENS
+            )
+            responses.append(res)
+            return _parse_jobs(res.content)
+
+        key = self._cache_key(EXTRACT_TEMPLATE, {"page_data": cleaned_text})
+        try:
+            jobs = await self.cache.aget_or_compute(key, compute, bypass=not use_cache)
+        except OutputParserException:
+            if responses:
+                self._record_usage("extract", prompt_tokens, started, responses[-1], responses[-1].content)
+            raise
+        response = responses[-1] if responses else None
+        self._record_usage("extract", prompt_tokens, started, response,
+                           response.content if response is not None else "")
+        return jobs
+
+    def _detect_role_level(self, job_data):
+        """Detect the seniority level of the role to adjust positioning"""
+        if isinstance(job_data, dict):
+            role = job_data.get('role', '').lower()
+            description = job_data.get('description', '').lower()
+            experience = job_data.get('experience', '').lower()
+        else:
+            role = str(job_data).lower()
+            description = role
+            experience = role
+
+        # Check for role level indicators
+        if any(word in role or word in description for word in ['intern', 'internship', 'trainee']):
+            return 'internship'
+        elif any(word in role or word in description for word in
+                 ['junior', 'entry', 'associate', '0-2 years', 'fresher']):
+            return 'junior'
+        elif any(word in role or word in description for word in
+                 ['senior', 'lead', 'principal', '5+ years', 'experienced']):
+            return 'senior'
+        else:
+            return 'mid'  # Default to mid-level
+
+    def _job_description(self, job):
+        """The job block of the email prompt: known fields only, long fields trimmed to the token budget"""
+        fields = [(key, label, str(job.get(key))) for key, label in EMAIL_JOB_FIELDS if _is_specified(job.get(key))]
+        fields.append(("level", "Role Level Detected", self._detect_role_level(job)))
+
+        fixed = sum(estimate_tokens(f"{label}: {value}") for key, label, value in fields
+                    if key not in TRIMMED_FIELDS)
+        remaining = max(0, self.email_job_tokens - fixed)
+        sizes = {key: estimate_tokens(value) for key, label, value in fields if key in TRIMMED_FIELDS}
+        allowance = {}
+        # Split what is left between the long fields, passing on whatever the shorter one does not need
+        for key in sorted(sizes, key=sizes.get):
+            share = remaining // (len(sizes) - len(allowance))
+            allowance[key] = min(sizes[key], share)
+            remaining -= allowance[key]
+
+        lines = [f"{label}: {trim_to_tokens(value, allowance[key]) if key in allowance else value}"
+                 for key, label, value in fields]
+        return "\n".join(lines)
+
+    def _email_variables(self, job, links=None):
+        # Use provided links or default to your portfolio (no matched projects counts as none given)
+        if not links:
+            links = [self.portfolio_link]
+        elif isinstance(links, str):
+            links = [links]
+
+        # Extract company name from job data or use default
+        if isinstance(job, dict) and _is_specified(job.get('company_name')):
+            company_name = str(job['company_name'])
+        else:
+            company_name = 'the company'
+
+        # Format job description properly
+        if isinstance(job, dict):
+            job_description = self._job_description(job)
+        else:
+            job_description = trim_to_tokens(str(job), self.email_job_tokens)
+
+        return {
             "job_description": job_description,
             "company_name": company_name,
             "link_list": "\n".join([f"- {link}" for link in links]),
             "portfolio_link": self.portfolio_link
-        })
-        return res.content
+        }
+
+    def _email_tokens(self, variables):
+        return estimate_tokens(EMAIL_TEMPLATE + "".join(variables.values()))
+
+    def write_mail(self, job, links=None, use_cache=True, priority=INTERACTIVE):
+        variables = self._email_variables(job, links)
+        prompt_tokens = self._email_tokens(variables)
+        started = time.perf_counter()
+        responses = []
+
+        def compute():
+            res = self.scheduler.run(lambda: self.email_chain.invoke(variables),
+                                     priority=priority, tokens=prompt_tokens + EMAIL_OUTPUT_TOKENS)
+            responses.append(res)
+            return res.content
+
+        key = self._cache_key(EMAIL_TEMPLATE, variables)
+        with trace.span("write", prompt_tokens=prompt_tokens):
+            email = self.cache.get_or_compute(key, compute, bypass=not use_cache)
+        self._record_usage("email", prompt_tokens, started, responses[-1] if responses else None, email)
+        return email
+
+    async def awrite_mail(self, job, links=None, use_cache=True, priority=INTERACTIVE):
+        """`write_mail` for asyncio; waits for the scheduler and the LLM without holding a thread"""
+        variables = self._email_variables(job, links)
+        prompt_tokens = self._email_tokens(variables)
+        started = time.perf_counter()
+        responses = []
+
+        async def compute():
+            res = await self.scheduler.arun(lambda: self.email_chain.ainvoke(variables),
+                                            priority=priority, tokens=prompt_tokens + EMAIL_OUTPUT_TOKENS)
+            responses.append(res)
+            return res.content
+
+        key = self._cache_key(EMAIL_TEMPLATE, variables)
+        with trace.span("write", prompt_tokens=prompt_tokens):
+            email = await self.cache.aget_or_compute(key, compute, bypass=not use_cache)
+        self._record_usage("email", prompt_tokens, started, responses[-1] if responses else None, email)
+        return email
+
+    def stream_mail(self, job, links=None, use_cache=True, priority=INTERACTIVE):
+        """
+        Generate the same email as `write_mail`, yielding text chunks as the LLM produces them
 
-    def generate_cold_email(self, job_data, custom_links=None):
+        A cached email is yielded in one piece. A fully streamed email is stored
+        in the cache once the stream ends, unless the provider sent no text.
+        """
+        variables = self._email_variables(job, links)
+        prompt_tokens = self._email_tokens(variables)
+        started = time.perf_counter()
+        key = self._cache_key(EMAIL_TEMPLATE, variables)
+        if use_cache:
+            cached = self.cache.get(key)
+            # An empty entry (stored before empty streams were skipped) is not an email
+            if cached:
+                self._record_usage("email", prompt_tokens, started)
+                yield cached
+                return
+
+        parts = []
+        last = None
+        with trace.span("write", prompt_tokens=prompt_tokens, streamed=True) as stage:
+            for chunk in self.scheduler.stream(lambda: self.email_chain.stream(variables),
+                                               priority=priority, tokens=prompt_tokens + EMAIL_OUTPUT_TOKENS):
+                # Providers report usage on the final chunk
+                if getattr(chunk, "usage_metadata", None) or last is None:
+                    last = chunk
+                if chunk.content:
+                    if not parts:
+                        stage.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                    parts.append(chunk.content)
+                    yield chunk.content
+        email = "".join(parts)
+        if email.strip():
+            self.cache.set(key, email)
+        self._record_usage("email", prompt_tokens, started, last, email)
+
+    def _write_variant(self, variables, spec, use_cache=True, priority=INTERACTIVE):
+        variables = dict(variables, tone=TONES.get(spec["tone"], spec["tone"]))
+        prompt_tokens = self._email_tokens(variables)
+        started = time.perf_counter()
+        responses = []
+        config = {"configurable": {"temperature": spec["temperature"]}}
+
+        def compute():
+            res = self.scheduler.run(lambda: self.variant_chain.invoke(variables, config=config),
+                                     priority=priority, tokens=prompt_tokens + EMAIL_OUTPUT_TOKENS)
+            responses.append(res)
+            return res.content
+
+        # The variant number is part of the key so equal settings still give separate emails
+        key = self.cache.make_key(f"{self.model_name}@{spec['temperature']}", EMAIL_VARIANT_TEMPLATE,
+                                  dict(variables, variant=str(spec["variant"])))
+        with trace.span("write", variant=spec["variant"], tone=spec["tone"], temperature=spec["temperature"]):
+            email = self.cache.get_or_compute(key, compute, bypass=not use_cache)
+        self._record_usage("variant", prompt_tokens, started, responses[-1] if responses else None, email)
+        return email
+
+    def write_variants(self, job, n=3, links=None, temperatures=None, tones=None, link_sets=None,
+                       use_cache=None, priority=INTERACTIVE):
+        """
+        Write `n` alternative emails for one job at the same time and rank them
+
+        Variant i uses temperature `temperatures[i % len]`, tone `tones[i % len]`
+        (a key of CMGvariants.TONES or a free-text instruction) and links
+        `link_sets[i % len]` (`links` for all when no sets are given). The
+        variants run in parallel, each through the scheduler, so with `n` at
+        or below the scheduler's concurrency they take about as long as one
+        email. By default (`use_cache=None`) only temperature-0 variants use
+        the response cache, so asking again gives fresh alternatives; pass
+        True to cache every variant or False to cache none.
+
+        Returns:
+            Dicts with `email`, `temperature`, `tone`, `links`, `score` and
+            the score's `checks`, best first (see CMGvariants.score_email)
+        """
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        temperatures = list(temperatures or VARIANT_TEMPERATURES)
+        tones = list(tones or TONES)
+        specs = []
+        for i in range(n):
+            variant_links = link_sets[i % len(link_sets)] if link_sets else links
+            specs.append({"variant": i, "temperature": temperatures[i % len(temperatures)],
+                          "tone": tones[i % len(tones)], "links": variant_links,
+                          "variables": self._email_variables(job, variant_links)})
+
+        with trace.span("variants", n=n):
+            emails = RunnableLambda(
+                lambda spec: self._write_variant(spec["variables"], spec,
+                                                 spec["temperature"] == 0 if use_cache is None else use_cache,
+                                                 priority)
+            ).batch(specs, config={"max_concurrency": max(1, n)}, return_exceptions=True)
+
+        variants = []
+        for spec, email in zip(specs, emails):
+            if isinstance(email, Exception):
+                continue
+            links_used = spec["links"] or [self.portfolio_link]
+            links_used = [links_used] if isinstance(links_used, str) else list(links_used)
+            # The default portfolio link is in every signature, so only matched projects are scored
+            checks = score_email(email, job, [link for link in links_used if link != self.portfolio_link])
+            variants.append({"email": email, "temperature": spec["temperature"], "tone": spec["tone"],
+                             "links": links_used, "score": checks.pop("score"), "checks": checks})
+        if not variants:
+            # Every variant failed; surface the first error
+            raise next(email for email in emails if isinstance(email, Exception))
+        return rank_variants(variants)
+
+    def generate_cold_email(self, job_data, custom_links=None, use_cache=True, priority=INTERACTIVE):
         """
         Convenience method to generate a cold email from job data
 
         Args:
             job_data: Dictionary containing job information or raw job description string
             custom_links: Optional list of specific portfolio links to include
+            use_cache: Set to False to skip the response cache and call the LLM
+            priority: INTERACTIVE (default) or BATCH; interactive calls are scheduled first
 
         Returns:
             Generated cold email as string
         """
-        return self.write_mail(job_data, custom_links)
+        return self.write_mail(job_data, custom_links, use_cache=use_cache, priority=priority)
 
 
 if __name__ == "__main__":
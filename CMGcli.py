@@ -0,0 +1,163 @@
+"""
+Command-line interface for running the pipeline without Streamlit.
+
+    python CMGcli.py extract URL
+    python CMGcli.py generate URL [--no-portfolio] [--json]
+    python CMGcli.py generate --job job.json
+    python CMGcli.py generate URL --variants 3   # ranked alternatives per job
+    python CMGcli.py index [--portfolio my_portfolio.csv]
+    python CMGcli.py batch urls.txt -o emails.jsonl
+    python CMGcli.py --trace generate URL      # stage timings and metrics on stderr
+
+Pipeline modules are imported inside each command so `--help` and argument
+errors return without loading LangChain, chromadb or the embedding model.
+"""
+import argparse
+import json
+import os
+import sys
+
+import CMGtrace as trace
+
+DEFAULT_PORTFOLIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Resource", "my_portfolio.csv")
+
+
+def _print_json(value):
+    print(json.dumps(value, ensure_ascii=False, indent=2))
+
+
+def _read_job(path):
+    # A JSON job dict as produced by `extract`, or a plain-text job description
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    try:
+        job = json.loads(content)
+    except ValueError:
+        return content
+    return job[0] if isinstance(job, list) and job else job
+
+
+def cmd_extract(args):
+    from CMGapi import extract_jobs
+
+    _print_json(extract_jobs(args.url, refresh=args.refresh, use_cache=not args.no_cache))
+
+
+def _print_variants(results):
+    for i, result in enumerate(results):
+        for rank, variant in enumerate(result["variants"], start=1):
+            if i or rank > 1:
+                print("\n" + "-" * 60 + "\n")
+            checks = ", ".join(f"{name} {value:.2f}" for name, value in variant["checks"].items())
+            print(f"# Variant {rank}: score {variant['score']:.2f} ({checks}); "
+                  f"tone {variant['tone']}, temperature {variant['temperature']}\n")
+            print(variant["email"])
+
+
+def cmd_generate(args):
+    from CMGapi import extract_jobs, generate, match_links, write_email, write_variants
+
+    portfolio_csv = None if args.no_portfolio else args.portfolio
+    if args.variants > 1:
+        jobs = [_read_job(args.job)] if args.job else extract_jobs(args.url, refresh=args.refresh,
+                                                                     use_cache=not args.no_cache)
+        results = []
+        for job in jobs:
+            links = match_links(job, portfolio_csv) if portfolio_csv and isinstance(job, dict) else None
+            results.append({"job": job, "links": links,
+                            "variants": write_variants(job, args.variants, links, None,
+                                                       use_cache=False if args.no_cache else None)})
+        if args.json:
+            _print_json(results)
+        else:
+            _print_variants(results)
+        return
+    if args.job:
+        job = _read_job(args.job)
+        links = match_links(job, portfolio_csv) if portfolio_csv and isinstance(job, dict) else None
+        results = [{"job": job, "links": links,
+                    "email": write_email(job, links, None, use_cache=not args.no_cache)}]
+    else:
+        results = generate(args.url, portfolio_csv, refresh=args.refresh, use_cache=not args.no_cache)
+
+    if args.json:
+        _print_json(results)
+        return
+    for i, result in enumerate(results):
+        if i:
+            print("\n" + "-" * 60 + "\n")
+        print(result["email"])
+
+
+def cmd_index(args):
+    from CMGapi import index_portfolio
+
+    counts = index_portfolio(args.portfolio)
+    print(f"Portfolio indexed: {counts['added']} added, {counts['deleted']} deleted, {counts['total']} total")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="CMGcli.py", description="Cold email generator without the web UI")
+    # Listed for --help only; main() takes it off the front of the arguments
+    parser.add_argument("--trace", action="store_true",
+                        help="Print the time spent in each stage and the collected metrics to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extract = commands.add_parser("extract", help="Print the job postings found at a URL as JSON")
+    extract.add_argument("url")
+    extract.set_defaults(func=cmd_extract)
+
+    generate = commands.add_parser("generate", help="Write a cold email for each job at a URL")
+    source = generate.add_mutually_exclusive_group(required=True)
+    source.add_argument("url", nargs="?", help="Job posting or careers page URL")
+    source.add_argument("--job", help="JSON job dict (as printed by `extract`) or a plain-text description")
+    generate.add_argument("--portfolio", default=DEFAULT_PORTFOLIO, help="Portfolio CSV for link matching")
+    generate.add_argument("--no-portfolio", action="store_true",
+                          help="Skip portfolio matching and use the default portfolio link")
+    generate.add_argument("--json", action="store_true", help="Print jobs, links and emails as JSON")
+    generate.add_argument("--variants", type=int, default=1, metavar="N",
+                          help="Write N emails per job in parallel with different tones and temperatures, "
+                               "ranked best first")
+    generate.set_defaults(func=cmd_generate)
+
+    for command in (extract, generate):
+        command.add_argument("--refresh", action="store_true", help="Extract again even if the page is stored")
+        command.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+
+    index = commands.add_parser("index", help="Sync the portfolio vector store with the CSV")
+    index.add_argument("--portfolio", default=DEFAULT_PORTFOLIO)
+    index.set_defaults(func=cmd_index)
+
+    # Listed for --help only; main() hands `batch` arguments to CMGbatch's own parser
+    commands.add_parser("batch", add_help=False, help="Run CMGbatch on a file of URLs (see `batch -h`)")
+    return parser
+
+
+def _print_trace():
+    for line in trace.format_spans(trace.recent_spans()):
+        print(line, file=sys.stderr)
+    print(trace.render_prometheus(), file=sys.stderr, end="")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Handled here rather than by argparse so it also applies to `batch`
+    tracing = argv[:1] == ["--trace"]
+    if tracing:
+        argv = argv[1:]
+        trace.enable()
+    try:
+        with trace.request():
+            if argv[:1] == ["batch"]:
+                from CMGbatch import main as batch_main
+
+                return batch_main(argv[1:])
+            args = build_parser().parse_args(argv)
+            return args.func(args)
+    finally:
+        if tracing:
+            _print_trace()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+
+import CMGtrace as trace
+from CMGcache import default_cache_dir
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """
+    Local sentence-transformers embeddings behind a persistent cache.
+
+    Vectors are stored in SQLite keyed by a hash of the model name and the
+    text, with a small in-memory LRU in front, so skill strings that repeat
+    across jobs ("Python", "SQL") are embedded once. Misses are encoded
+    together in one batch on the configured device.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, device="cpu", batch_size=64, cache_path=None,
+                 memory_size=10000, model=None):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.memory_size = memory_size
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_path is None:
+            cache_dir = default_cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self.cache_path = cache_path
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            model_name=os.getenv("CMG_EMBEDDING_MODEL", DEFAULT_MODEL),
+            device=os.getenv("CMG_EMBEDDING_DEVICE", "cpu"),
+            batch_size=int(os.getenv("CMG_EMBEDDING_BATCH_SIZE", 64)),
+        )
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def warm_up(self):
+        """Load the model and run one encode so the first real query does not pay for it"""
+        self.model.encode(["warm up"], batch_size=1, convert_to_numpy=True)
+        return self
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def __call__(self, input):
+        keys = [self._key(text) for text in input]
+        vectors = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+            missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+            # SQLite caps bound parameters, so look keys up in slices
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vectors[key] = np.frombuffer(blob, dtype=np.float32)
+                    self._remember(key, vectors[key])
+
+        texts = {}
+        for key, text in zip(keys, input):
+            if key not in vectors:
+                texts.setdefault(key, text)
+        self.hits += len(keys) - len(texts)
+        self.misses += len(texts)
+        trace.inc("cmg_cache_requests_total", len(keys) - len(texts), cache="embedding", result="hit")
+        trace.inc("cmg_cache_requests_total", len(texts), cache="embedding", result="miss")
+
+        if texts:
+            encoded = self.model.encode(list(texts.values()), batch_size=self.batch_size,
+                                        convert_to_numpy=True, normalize_embeddings=True)
+            encoded = np.asarray(encoded, dtype=np.float32)
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(texts, encoded)]
+                )
+                self._conn.commit()
+                for key, vector in zip(texts, encoded):
+                    vectors[key] = vector
+                    self._remember(key, vector)
+
+        return [vectors[key] for key in keys]
+
+    @staticmethod
+    def name():
+        return "cmg_cached_sentence_transformer"
+
+    def get_config(self):
+        return {"model_name": self.model_name, "device": self.device, "batch_size": self.batch_size}
+
+    @staticmethod
+    def build_from_config(config):
+        return CachedEmbeddingFunction(**config)
+
+    def default_space(self):
+        return "cosine"
@@ -0,0 +1,304 @@
+import asyncio
+import json
+import re
+from html import unescape
+from html.parser import HTMLParser
+
+import CMGtrace as trace
+from CMGrules import MIN_CONFIDENCE, extract_jobs_by_rules
+
+# Subtrees that never hold job content
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "footer",
+             "header", "aside", "form", "button", "select", "head"}
+# Inside <main>/<article> these usually wrap the job title, not site chrome
+PAGE_CHROME_TAGS = {"header", "footer"}
+# Elements that end a run of text
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "table",
+              "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr", "blockquote", "pre",
+              "body"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source",
+             "track", "wbr"}
+MAIN_TAGS = {"main", "article"}
+BOILERPLATE_RE = re.compile(
+    r"cookie|consent|gdpr|newsletter|breadcrumb|social|share|popup|modal|navbar|menu|footer|sidebar|"
+    r"skip-link",
+    re.IGNORECASE
+)
+MAX_LINK_DENSITY = 0.5
+
+
+class _PageParser(HTMLParser):
+    """Single-pass parser that collects text blocks outside boilerplate and any JSON-LD scripts"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.link_depth = 0
+        self.in_json_ld = False
+        self.json_ld = []
+        self.blocks = []
+        self._parts = []
+        self._link_chars = 0
+        self._block_tag = None
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        if text:
+            self.blocks.append({
+                "text": text,
+                "tag": self._block_tag,
+                "link_density": self._link_chars / len(text),
+                "in_main": self.main_depth > 0,
+            })
+        self._parts = []
+        self._link_chars = 0
+        self._block_tag = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS:
+                self._flush()
+            return
+
+        attrs = dict(attrs)
+        skip = (tag in SKIP_TAGS and not (tag in PAGE_CHROME_TAGS and self.main_depth)) or \
+            attrs.get("aria-hidden") == "true" or \
+            BOILERPLATE_RE.search(" ".join(filter(None, [attrs.get("id"), attrs.get("class"),
+                                                         attrs.get("role")])))
+        if tag == "script" and (attrs.get("type") or "").lower() == "application/ld+json":
+            self.in_json_ld = True
+            self.json_ld.append("")
+            skip = True
+        is_main = tag in MAIN_TAGS or attrs.get("role") == "main"
+
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._block_tag = tag
+        self.stack.append((tag, bool(skip), is_main))
+        if skip:
+            self.skip_depth += 1
+        if is_main:
+            self.main_depth += 1
+        if tag == "a":
+            self.link_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _, _ in self.stack):
+            return
+        # Close everything left open inside this element (e.g. unclosed <p> or <li>)
+        while self.stack:
+            open_tag, skip, is_main = self.stack.pop()
+            if open_tag in BLOCK_TAGS:
+                self._flush()
+            if skip:
+                self.skip_depth -= 1
+            if is_main:
+                self.main_depth -= 1
+            if open_tag == "a":
+                self.link_depth -= 1
+            if open_tag == "script":
+                self.in_json_ld = False
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.in_json_ld:
+            self.json_ld[-1] += data
+            return
+        if self.skip_depth:
+            return
+        self._parts.append(data)
+        if self.link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def _main_blocks(blocks):
+    # Prefer blocks inside <main>/<article> when the page marks its content
+    main = [block for block in blocks if block["in_main"]]
+    kept = []
+    seen = set()
+    for block in main or blocks:
+        text = block["text"]
+        if block["link_density"] > MAX_LINK_DENSITY:
+            continue
+        # Repeated paragraphs are dropped, repeated section headings are kept
+        if text in seen and block["tag"] not in HEADING_TAGS:
+            continue
+        # Lone words outside headings and list items are usually UI labels
+        if len(text.split()) < 2 and block["tag"] not in HEADING_TAGS and block["tag"] != "li":
+            continue
+        seen.add(text)
+        kept.append(text)
+    return kept
+
+
+def _json_ld_items(raw):
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return []
+    items = data if isinstance(data, list) else [data]
+    found = []
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("@graph"), list):
+            found.extend(i for i in item["@graph"] if isinstance(i, dict))
+        elif isinstance(item, dict):
+            found.append(item)
+    return found
+
+
+def _is_job_posting(item):
+    kind = item.get("@type")
+    kinds = kind if isinstance(kind, list) else [kind]
+    return "JobPosting" in kinds
+
+
+def _html_to_text(value):
+    parser = _PageParser()
+    parser.feed(unescape(str(value)))
+    parser.close()
+    return " ".join(block["text"] for block in parser.blocks)
+
+
+def _join(value):
+    if isinstance(value, list):
+        return ", ".join(_join(v) for v in value if v)
+    if isinstance(value, dict):
+        return value.get("name") or value.get("description") or ""
+    return str(value).strip() if value else ""
+
+
+def _experience(value):
+    if isinstance(value, dict):
+        months = value.get("monthsOfExperience")
+        if months:
+            try:
+                return f"{float(months) / 12:g}+ years"
+            except (TypeError, ValueError):
+                pass
+        return _join(value.get("description"))
+    return _join(value)
+
+
+def job_from_json_ld(item):
+    """Map a schema.org JobPosting object to the job dict produced by Chain.extract_jobs"""
+    fields = {
+        "role": _join(item.get("title")),
+        "experience": _experience(item.get("experienceRequirements")),
+        "skills": _join(item.get("skills")),
+        "description": _html_to_text(item.get("description", "")),
+        "requirements": _join(item.get("qualifications") or item.get("educationRequirements")),
+        "company_challenges": "",
+        "preferred_skills": "",
+        "company_name": _join(item.get("hiringOrganization")),
+    }
+    return {key: value or "Not specified" for key, value in fields.items()}
+
+
+def extract_page(html):
+    """
+    Parse an HTML page once and return (main_text, job_postings)
+
+    main_text keeps only the content blocks of the page: navigation,
+    headers, footers, scripts, forms and cookie/consent banners are dropped,
+    as are link-heavy blocks. job_postings holds a job dict for each
+    schema.org JobPosting found in JSON-LD, which is enough to skip the LLM.
+    """
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+
+    jobs = []
+    for raw in parser.json_ld:
+        for item in _json_ld_items(raw):
+            if _is_job_posting(item):
+                jobs.append(job_from_json_ld(item))
+    return "\n".join(_main_blocks(parser.blocks)), jobs
+
+
+def _parse(html):
+    with trace.span("parse", size=len(html)) as stage:
+        text, jobs = extract_page(html)
+        stage.set(json_ld_jobs=len(jobs))
+    return text, jobs
+
+
+def _offline_jobs(text, jobs, min_confidence):
+    # JSON-LD or confident rule-based jobs, or None when the page needs the LLM
+    if jobs:
+        return jobs
+    with trace.span("rules") as stage:
+        jobs, confidence = extract_jobs_by_rules(text)
+        stage.set(jobs=len(jobs), confidence=round(confidence, 2))
+    if jobs and confidence >= (MIN_CONFIDENCE if min_confidence is None else min_confidence):
+        return jobs
+    return None
+
+
+def _clean(text, clean_text):
+    # Blocks are joined with newlines for the rules; clean_text drops newlines, so make them spaces
+    with trace.span("clean", size=len(text)):
+        return clean_text(text.replace("\n", " "))
+
+
+def _page_jobs(text, jobs, llm, clean_text, min_confidence, extract_kwargs):
+    jobs = _offline_jobs(text, jobs, min_confidence)
+    if jobs is not None:
+        return jobs
+    return llm.extract_jobs(_clean(text, clean_text), **extract_kwargs)
+
+
+def load_jobs(html, llm, clean_text, min_confidence=None, **extract_kwargs):
+    """
+    Return the jobs on a page, trying the cheapest source first
+
+    JSON-LD postings are used as they are. Otherwise the rule-based
+    extractor runs on the page text, and its jobs are used when its
+    confidence is at least `min_confidence` (CMGrules.MIN_CONFIDENCE by
+    default). Only the remaining pages go to the LLM.
+    """
+    text, jobs = _parse(html)
+    return _page_jobs(text, jobs, llm, clean_text, min_confidence, extract_kwargs)
+
+
+def _offline_or_cleaned(html, clean_text, min_confidence):
+    # (jobs, None) when the page needs no LLM, else (None, cleaned text)
+    text, jobs = _parse(html)
+    jobs = _offline_jobs(text, jobs, min_confidence)
+    return (jobs, None) if jobs is not None else (None, _clean(text, clean_text))
+
+
+async def aload_jobs(html, llm, clean_text, min_confidence=None, **extract_kwargs):
+    """
+    `load_jobs` for asyncio. Parsing, rules and cleaning are CPU work that
+    grows with the page, so they run on a worker thread and a large page
+    does not stall the event loop; the LLM fallback is awaited.
+    """
+    jobs, cleaned = await asyncio.to_thread(_offline_or_cleaned, html, clean_text, min_confidence)
+    if jobs is not None:
+        return jobs
+    return await llm.aextract_jobs(cleaned, **extract_kwargs)
+
+
+def load_posting(html, url, store, llm, clean_text, refresh=False, min_confidence=None, **extract_kwargs):
+    """
+    Return (posting_id, rows) for a page, extracting it like `load_jobs`
+    only when `store` has not seen this URL with the same main text (or
+    `refresh` is set). rows are `JobStore.posting_jobs` dicts, with the job
+    under `job` and its `id` for saving emails.
+    """
+    text, jobs = _parse(html)
+    posting_id = None if refresh else store.find_posting(url, text)
+    if not refresh:
+        trace.inc("cmg_cache_requests_total", cache="job_store", result="miss" if posting_id is None else "hit")
+    if posting_id is None:
+        jobs = _page_jobs(text, jobs, llm, clean_text, min_confidence, extract_kwargs)
+        posting_id = store.save_posting(url, text, jobs)
+    return posting_id, store.posting_jobs(posting_id)
@@ -0,0 +1,191 @@
+import codecs
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import CMGtrace as trace
+from CMGcache import default_cache_dir
+from CMGutils import parse_retry_after
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+
+
+def _html_encoding(response):
+    """
+    Charset of an HTML response: the Content-Type header's, then the page's
+    <meta charset>, then UTF-8 if the bytes decode as it, then a guess.
+    requests would otherwise fall back to ISO-8859-1 for text/html without
+    a charset and garble UTF-8 pages.
+    """
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        return response.encoding
+    match = _META_CHARSET_RE.search(response.content[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    try:
+        response.content.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return response.apparent_encoding
+
+
+class DomainRateLimiter:
+    """Spaces out requests to the same host by at least `min_interval` seconds"""
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PageCache:
+    """On-disk store of page bodies with their ETag / Last-Modified validators"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{key}.json"), os.path.join(self.path, f"{key}.html")
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, encoding="utf-8") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def set(self, url, meta, body):
+        meta_path, body_path = self._paths(url)
+        # Write the body first and swap files in atomically so readers never see half a page
+        for path, content in ((body_path, body), (meta_path, json.dumps(meta))):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+
+class PageFetcher:
+    """
+    HTTP fetcher shared by the app and the batch runner.
+
+    Keeps a pooled keep-alive session, revalidates cached pages with
+    If-None-Match / If-Modified-Since so an unchanged page costs a 304,
+    spaces out requests per host, and retries connection errors and
+    429/5xx responses with jittered exponential backoff (honouring
+    Retry-After).
+    """
+
+    def __init__(self, cache_dir=None, pool_size=16, min_interval=1.0, max_retries=3,
+                 backoff=0.5, max_backoff=30.0, timeout=20, session=None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = PageCache(cache_dir or os.path.join(default_cache_dir(), "pages"))
+        self.rate_limiter = DomainRateLimiter(min_interval)
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            session.headers["User-Agent"] = os.getenv(
+                "USER_AGENT", "Mozilla/5.0 (compatible; ColdEmailGenerator/1.0)"
+            )
+        self.session = session
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _delay(self, attempt, response=None):
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    def _request(self, url, headers):
+        host = urlparse(url).netloc.lower()
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait(host)
+            self._count("requests")
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self._count("retries")
+                trace.inc("cmg_retries_total", source="fetch", reason="connection")
+                time.sleep(self._delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self._count("retries")
+                trace.inc("cmg_retries_total", source="fetch", reason=str(response.status_code))
+                time.sleep(self._delay(attempt, response))
+                continue
+            return response
+
+    def fetch(self, url, use_cache=True):
+        """Return the HTML of `url`, revalidating a cached copy when there is one"""
+        with trace.span("fetch", host=urlparse(url).netloc.lower()) as stage:
+            meta, body = self.cache.get(url) if use_cache else (None, None)
+            headers = {}
+            if meta is not None:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+
+            response = self._request(url, headers)
+            stage.set(status=response.status_code)
+            if meta is not None:
+                trace.inc("cmg_cache_requests_total", cache="page",
+                          result="hit" if response.status_code == 304 else "miss")
+            if response.status_code == 304 and body is not None:
+                self._count("not_modified")
+                return body
+            response.raise_for_status()
+
+            response.encoding = _html_encoding(response)
+            html = response.text
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.cache.set(url, {"url": url, "etag": etag, "last_modified": last_modified,
+                                     "fetched_at": time.time()}, html)
+            return html
@@ -1,65 +1,79 @@
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
 
-from CMGchain import Chain
-from CMGportfolio import Portfolio
+import CMGtrace as trace
+from CMGbatch import BatchRunner, read_urls
+from CMGextract import load_posting
+from CMGresources import get_chain, get_fetcher, get_portfolio, get_store
 from CMGutils import clean_text
 
+import json
 import os
 
 
 # Dynamically find correct path
 base_dir = os.path.dirname(os.path.abspath(__file__))
 csv_path = os.path.join(base_dir, "Resource", "my_portfolio.csv")
+# Jobs per page in the summary and saved-jobs views
+PAGE_SIZE = 10
 
-portfolio = Portfolio(csv_path)
 
-def create_streamlit_app(llm, portfolio, clean_text):
+def create_streamlit_app(llm, portfolio, clean_text, fetcher=None, store=None):
+    fetcher = fetcher or get_fetcher()
+    store = store or get_store()
     st.title("📧 Cold Mail Generator")
     
     # URL input section
     url_input = st.text_input("Enter a URL:", value="https://jobs.nike.com/job/R-33460")
     submit_button = st.button("Extract Jobs")
 
-    # Initialize session state for jobs
-    if 'jobs_data' not in st.session_state:
-        st.session_state.jobs_data = []
+    # Jobs and emails live in the job store; the session only remembers which posting is open
+    if 'posting_id' not in st.session_state:
+        st.session_state.posting_id = None
     if 'url_processed' not in st.session_state:
         st.session_state.url_processed = ""
 
     if submit_button:
-        try:
-            with st.spinner("Extracting job postings..."):
-                loader = WebBaseLoader([url_input])
-                data = clean_text(loader.load().pop().page_content)
-                portfolio.load_portfolio()
-                jobs = llm.extract_jobs(data)
+        # Spans of this action share one request id, shown in the debug panel
+        with trace.request(force=st.session_state.get('trace_enabled', False)):
+            st.session_state.trace_request_id = trace.current_request_id()
+            try:
+                with st.spinner("Extracting job postings..."):
+                    html = fetcher.fetch(url_input)
+                    portfolio.load_portfolio()
+                    # A page seen before with the same content comes straight from the store;
+                    # otherwise JSON-LD and the rule-based extractor are tried before the LLM
+                    bypass = st.session_state.get('bypass_cache', False)
+                    posting_id, rows = load_posting(html, url_input, store, llm, clean_text,
+                                                    refresh=bypass, use_cache=not bypass)
                 
-                # Store jobs in session state
-                st.session_state.jobs_data = jobs
-                st.session_state.url_processed = url_input
+                    st.session_state.posting_id = posting_id
+                    st.session_state.url_processed = url_input
                 
-                if jobs:
-                    st.success(f"✅ Found {len(jobs)} job posting(s)!")
-                else:
-                    st.warning("No job postings found. Please check the URL.")
+                    if rows:
+                        st.success(f"✅ Found {len(rows)} job posting(s)!")
+                    else:
+                        st.warning("No job postings found. Please check the URL.")
                     
-        except Exception as e:
-            st.error(f"An Error Occurred: {e}")
+            except Exception as e:
+                st.error(f"An Error Occurred: {e}")
+
+    # Only the indexed columns are read on each rerun; the selected job is decoded on its own
+    posting_id = st.session_state.posting_id
+    rows = store.posting_jobs(posting_id, include_job=False) if posting_id is not None else []
 
     # Display job selection and email generation
-    if st.session_state.jobs_data:
+    if rows:
         st.markdown("---")
         st.subheader("📋 Available Job Postings")
         
         # Create tabs if multiple jobs, otherwise show single job
-        if len(st.session_state.jobs_data) > 1:
+        if len(rows) > 1:
             # Create dropdown for job selection
             job_options = []
-            for i, job in enumerate(st.session_state.jobs_data):
-                role = job.get('role', 'Unknown Role')
-                company = job.get('company_name', 'Unknown Company')
-                experience = job.get('experience', 'Not specified')
+            for i, row in enumerate(rows):
+                role = row['role'] or 'Unknown Role'
+                company = row['company'] or 'Unknown Company'
+                experience = row['experience'] or 'Not specified'
                 job_options.append(f"Job {i+1}: {role} at {company} ({experience})")
             
             selected_job_index = st.selectbox(
@@ -68,11 +82,9 @@ def create_streamlit_app(llm, portfolio, clean_text):
                 format_func=lambda x: job_options[x]
             )
             
-            selected_job = st.session_state.jobs_data[selected_job_index]
-            
         else:
-            selected_job = st.session_state.jobs_data[0]
             selected_job_index = 0
+        selected_job = store.job(rows[selected_job_index]['id'])
         
         # Display selected job details
         col1, col2 = st.columns([1, 1])
@@ -109,41 +121,70 @@ def create_streamlit_app(llm, portfolio, clean_text):
                         if link:
                             custom_links.append(link)
             
+            # Several emails per job are written in parallel and ranked, for A/B testing
+            num_variants = st.number_input("Variants to compare", min_value=1, max_value=5, value=1,
+                                           help="Write this many emails at once with different tones "
+                                                "and temperatures, best scoring first")
+
             # Generate email button
             generate_email_btn = st.button("🚀 Generate Cold Email", type="primary")
             
             if generate_email_btn:
-                try:
-                    with st.spinner("Generating personalized cold email..."):
-                        # Get portfolio links
-                        if use_custom_links and custom_links:
-                            links = custom_links
-                        else:
-                            skills = selected_job.get('skills', [])
-                            if isinstance(skills, str):
-                                skills = [s.strip() for s in skills.split(',')]
-                            links = portfolio.query_links(skills)
-                        
-                        # Generate email
-                        email = llm.write_mail(selected_job, links)
+                # Spans of this action share one request id, shown in the debug panel
+                with trace.request(force=st.session_state.get('trace_enabled', False)):
+                    st.session_state.trace_request_id = trace.current_request_id()
+                    try:
+                        with st.spinner("Matching your portfolio projects..."):
+                            # Get portfolio links
+                            if use_custom_links and custom_links:
+                                links = custom_links
+                            else:
+                                skills = selected_job.get('skills', [])
+                                if isinstance(skills, str):
+                                    skills = [s.strip() for s in skills.split(',')]
+                                links = portfolio.query_links(skills)
                         
                         # Display the email
                         st.markdown("---")
                         st.subheader("📧 Generated Cold Email")
-                        
+                    
                         # Create two columns for email display and actions
                         email_col1, email_col2 = st.columns([3, 1])
-                        
+                    
                         with email_col1:
-                            st.code(email, language='markdown')
-                        
+                            if num_variants > 1:
+                                with st.spinner(f"Writing {num_variants} variants..."):
+                                    # Sampled variants skip the cache, so Generate again gives new alternatives
+                                    variants = llm.write_variants(
+                                        selected_job, num_variants, links=links,
+                                        use_cache=False if st.session_state.get('bypass_cache', False) else None)
+                                tabs = st.tabs([f"#{rank} · {variant['score']:.2f}"
+                                                for rank, variant in enumerate(variants, start=1)])
+                                for tab, variant in zip(tabs, variants):
+                                    with tab:
+                                        checks = variant['checks']
+                                        st.caption(f"Tone: {variant['tone']} · temperature {variant['temperature']} · "
+                                                   + " · ".join(f"{name} {value:.2f}" for name, value in checks.items()))
+                                        st.code(variant['email'], language='markdown')
+                                email = variants[0]['email']
+                            else:
+                                # Render tokens as they arrive, then swap in the copyable code block
+                                email_box = st.empty()
+                                email = ""
+                                for token in llm.stream_mail(selected_job, links,
+                                                             use_cache=not st.session_state.get('bypass_cache', False)):
+                                    email += token
+                                    email_box.markdown(email + "▌")
+                                email_box.code(email, language='markdown')
+                                variants = [{'email': email, 'links': links}]
+                    
                         with email_col2:
                             st.markdown("### Actions")
-                            
+                        
                             # Copy to clipboard button (using st.code with copy button)
                             if st.button("📋 Copy Email"):
                                 st.success("Email copied to clipboard!")
-                            
+                        
                             # Download as text file
                             st.download_button(
                                 label="💾 Download Email",
@@ -151,25 +192,30 @@ def create_streamlit_app(llm, portfolio, clean_text):
                                 file_name=f"cold_email_{selected_job.get('role', 'job').replace(' ', '_').lower()}.txt",
                                 mime="text/plain"
                             )
-                            
+                        
                             # Regenerate button
                             if st.button("🔄 Regenerate Email"):
                                 st.rerun()
-                        
-                        # Store generated email in session state for potential regeneration
-                        if 'generated_emails' not in st.session_state:
-                            st.session_state.generated_emails = {}
-                        st.session_state.generated_emails[selected_job_index] = email
-                        
-                except Exception as e:
-                    st.error(f"Error generating email: {e}")
+                    
+                        # Keep every generated email (and every variant) with its job
+                        for variant in variants:
+                            store.save_email(rows[selected_job_index]['id'], variant['email'], variant['links'])
+                    
+                    except Exception as e:
+                        st.error(f"Error generating email: {e}")
         
         # Show summary of all jobs if multiple exist
-        if len(st.session_state.jobs_data) > 1:
+        if len(rows) > 1:
             st.markdown("---")
             st.subheader("📊 All Job Postings Summary")
-            
-            for i, job in enumerate(st.session_state.jobs_data):
+
+            # Render (and decode) one page of expanders per rerun, however many jobs the posting has
+            pages = -(-len(rows) // PAGE_SIZE)
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1,
+                                   key="summary_page") if pages > 1 else 1
+            result = store.query_jobs(posting_id=posting_id, order="position", page=page, page_size=PAGE_SIZE)
+            start = (page - 1) * PAGE_SIZE
+            for i, job in enumerate((item['job'] for item in result['items']), start=start):
                 with st.expander(f"Job {i+1}: {job.get('role', 'Unknown Role')} at {job.get('company_name', 'Unknown Company')}"):
                     col_a, col_b = st.columns(2)
                     with col_a:
@@ -207,9 +253,120 @@ def create_streamlit_app(llm, portfolio, clean_text):
         - Individual job posting URLs
         """)
 
+        st.markdown("## ⚡ Response Cache")
+        st.checkbox("Bypass response cache", key="bypass_cache",
+                    help="Always call the LLM instead of reusing a stored answer for identical input")
+        stats = llm.cache.stats()
+        st.caption(f"{stats['hits']} hits · {stats['misses']} misses · {stats['entries']} stored")
+
+        st.markdown("## 📊 LLM Usage")
+        usage = llm.usage.summary()
+        if not usage:
+            st.caption("No requests yet")
+        for kind, totals in usage.items():
+            tokens = totals['prompt_tokens'] + totals['completion_tokens']
+            st.caption(f"**{kind}**: {totals['requests']} requests ({totals['cached']} cached) · "
+                       f"{tokens} tokens · {totals['mean_latency']:.2f}s avg")
+
+        create_debug_panel()
+
+
+def create_debug_panel():
+    st.markdown("## 🔍 Debug")
+    # Per session: traces this session's own actions (read before they run) and shows the panel.
+    # CMG_TRACE and the metrics server keep tracing on for every session regardless
+    tracing = st.checkbox("Trace pipeline stages", value=trace.enabled(), key="trace_enabled",
+                          help="Time each stage (fetch, parse, extract, match, write) of your requests")
+    if not tracing:
+        return
+
+    request_id = st.session_state.get('trace_request_id')
+    spans = trace.recent_spans(request_id) if request_id else []
+    if spans:
+        st.caption(f"Last request `{request_id}`")
+        st.code("\n".join(trace.format_spans(spans)), language="text")
+    else:
+        st.caption("Run an extraction or generate an email to see its stages")
+
+    with st.expander("Stage totals"):
+        for stage, totals in sorted(trace.stage_summary().items()):
+            st.caption(f"**{stage}**: {totals['count']} × {totals['mean'] * 1000:.0f} ms avg")
+    with st.expander("Prometheus metrics"):
+        st.code(trace.render_prometheus(), language="text")
+
+
+def create_batch_section(llm, portfolio, clean_text):
+    st.markdown("---")
+    st.subheader("📦 Batch Mode")
+
+    with st.expander("Generate emails for a list of job URLs"):
+        urls_file = st.file_uploader("Upload a text file with one URL per line", type=["txt"])
+        col_a, col_b = st.columns(2)
+        with col_a:
+            per_host = st.number_input("Concurrent fetches per host", min_value=1, max_value=8, value=2)
+        with col_b:
+            workers = st.number_input("Worker threads", min_value=1, max_value=16, value=4)
+        run_batch_btn = st.button("▶️ Run Batch", disabled=urls_file is None)
+
+        if run_batch_btn and urls_file is not None:
+            urls = read_urls(urls_file.getvalue().splitlines())
+            if not urls:
+                st.warning("No URLs found in the uploaded file.")
+                return
+
+            runner = BatchRunner(llm, portfolio, clean_text=clean_text, fetcher=get_fetcher(),
+                                 per_host_limit=per_host, workers=workers, store=get_store())
+            progress = st.progress(0.0, text=f"Processing 0/{len(urls)} URLs...")
+            log = st.empty()
+            lines = []
+            statuses = []
+            for i, result in enumerate(runner.iter_results(urls), start=1):
+                lines.append(json.dumps(result, ensure_ascii=False))
+                progress.progress(i / len(urls), text=f"Processing {i}/{len(urls)} URLs...")
+                statuses.append(f"{'✅' if result['status'] == 'ok' else '❌'} {result['url']}")
+                log.text("\n".join(statuses[-10:]))
+
+            st.success(f"✅ Finished {len(lines)} URL(s)")
+            st.download_button(
+                label="💾 Download Results (JSONL)",
+                data="\n".join(lines) + "\n",
+                file_name="cold_emails.jsonl",
+                mime="application/jsonl"
+            )
+
+
+def create_saved_jobs_section(store=None):
+    store = store or get_store()
+    st.markdown("---")
+    st.subheader("🗂️ Saved Jobs")
+
+    with st.expander("Browse previously extracted jobs and emails"):
+        col_a, col_b, col_c = st.columns([2, 2, 1])
+        with col_a:
+            company = st.text_input("Company starts with", key="saved_company")
+        with col_b:
+            role = st.text_input("Role starts with", key="saved_role")
+        with col_c:
+            page = st.number_input("Page", min_value=1, value=1, key="saved_page")
+
+        result = store.query_jobs(company=company.strip() or None, role=role.strip() or None,
+                                  page=page, page_size=PAGE_SIZE)
+        st.caption(f"{result['total']} job(s) · page {result['page']} of {result['pages']}")
+        for row in result['items']:
+            with st.expander(f"{row['role']} at {row['company']} ({row['experience']})"):
+                st.write(f"**Skills:** {row['job'].get('skills', 'Not specified')}")
+                emails = store.emails(row['id'], limit=1)
+                if emails:
+                    st.code(emails[0]['email'], language='markdown')
+
 
 if __name__ == "__main__":
-    chain = Chain()
-    portfolio = Portfolio(csv_path)
     st.set_page_config(layout="wide", page_title="Cold Email Generator", page_icon="📧")
-    create_streamlit_app(chain, portfolio, clean_text)
\ No newline at end of file
+    # Serves /metrics when CMG_METRICS_PORT is set; started once per process
+    trace.start_metrics_server()
+    # Shared across reruns and sessions; only rebuilt when the portfolio CSV changes
+    chain = get_chain()
+    portfolio = get_portfolio(csv_path)
+    create_streamlit_app(chain, portfolio, clean_text)
+    create_batch_section(chain, portfolio, clean_text)
+    create_saved_jobs_section()
\ No newline at end of file
@@ -1,13 +1,19 @@
+import asyncio
+import hashlib
+import os
+import re
+
 import pandas as pd
-import chromadb
-import uuid
 
+import CMGtrace as trace
+from CMGskills import SkillIndex, skill_key, split_skills
+
+# Vector neighbours further than this (cosine distance) are not a match for the skill
+MAX_VECTOR_DISTANCE = float(os.getenv("CMG_MATCH_MAX_DISTANCE", 0.6))
 
-import os
-import pandas as pd
 
 class Portfolio:
-    def __init__(self, file_path):
+    def __init__(self, file_path, batch_size=256, embedding_function=None, vectorstore_path=None):
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"CSV file not found: {file_path}")
 
@@ -16,27 +22,144 @@ class Portfolio:
         required_columns = {"Techstack", "Links"}
         if not required_columns.issubset(self.data.columns):
             raise ValueError(f"CSV must contain columns: {required_columns}")
+        self.skill_index = SkillIndex.from_frame(self.data)
 
-        base_dir = os.getcwd()
-        vectorstore_path = os.path.join(base_dir, "vectorstore")
+        if vectorstore_path is None:
+            base_dir = os.getcwd()
+            vectorstore_path = os.path.join(base_dir, "vectorstore")
         os.makedirs(vectorstore_path, exist_ok=True)
 
+        if embedding_function is None:
+            from CMGembeddings import CachedEmbeddingFunction
+            embedding_function = CachedEmbeddingFunction.from_env()
+        # Kept on the instance so query skills can be embedded in one batch
+        self.embedding_function = embedding_function
+
         try:
+            # chromadb takes about a second to import, so only pay for it when a portfolio is built
+            import chromadb
             self.chroma_client = chromadb.PersistentClient(path=vectorstore_path)
-            self.collection = self.chroma_client.get_or_create_collection(name="portfolio")
+            self.collection = self.chroma_client.get_or_create_collection(
+                name=self._collection_name(embedding_function), embedding_function=embedding_function
+            )
         except Exception as e:
             raise RuntimeError(f"Failed to initialize chroma client: {e}")
 
+        self.batch_size = max(1, min(batch_size, self.chroma_client.get_max_batch_size()))
+        self._synced_fingerprint = None
+        # What the most recent sync that changed anything added and deleted
+        self.last_sync = {"added": 0, "deleted": 0}
         self.load_portfolio()
 
+    @staticmethod
+    def _collection_name(embedding_function):
+        # Vectors from different models are not comparable, so each model gets its own collection
+        model_name = getattr(embedding_function, "model_name", None)
+        if not model_name:
+            return "portfolio"
+        return "portfolio-" + re.sub(r"[^a-zA-Z0-9._-]", "-", model_name)[:48].strip("-._")
+
+    @staticmethod
+    def _row_id(techstack, links):
+        # Stable across runs, so re-indexing an unchanged row is a no-op
+        return hashlib.sha256(f"{techstack}\x1f{links}".encode("utf-8")).hexdigest()[:32]
+
+    def _rows(self):
+        rows = {}
+        for techstack, links in zip(self.data["Techstack"].fillna("").astype(str),
+                                    self.data["Links"].fillna("").astype(str)):
+            rows.setdefault(self._row_id(techstack, links), (techstack, links))
+        return rows
 
+    def _batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
 
     def load_portfolio(self):
-        if not self.collection.count():
-            for _, row in self.data.iterrows():
-                self.collection.add(documents=row["Techstack"],
-                                    metadatas={"links": row["Links"]},
-                                    ids=[str(uuid.uuid4())])
-
-    def query_links(self, skills):
-        return self.collection.query(query_texts=skills, n_results=2).get('metadatas', [])
\ No newline at end of file
+        """Sync the collection with the CSV, adding new rows and deleting removed ones in batches"""
+        rows = self._rows()
+        fingerprint = hashlib.sha256("".join(sorted(rows)).encode("utf-8")).hexdigest()
+        if fingerprint == self._synced_fingerprint:
+            return {"added": 0, "deleted": 0}
+
+        existing = set(self.collection.get(include=[])["ids"])
+        to_add = [row_id for row_id in rows if row_id not in existing]
+        to_delete = sorted(existing.difference(rows))
+
+        # A changed row hashes to a new id, so an edit is a delete plus an add
+        for batch in self._batches(to_delete):
+            self.collection.delete(ids=batch)
+        for batch in self._batches(to_add):
+            self.collection.upsert(documents=[rows[row_id][0] for row_id in batch],
+                                   metadatas=[{"links": rows[row_id][1]} for row_id in batch],
+                                   ids=batch)
+
+        self._synced_fingerprint = fingerprint
+        self.last_sync = {"added": len(to_add), "deleted": len(to_delete)}
+        return dict(self.last_sync)
+
+    def match_links(self, skills, n_results=3, per_skill=2, rrf_k=60, index_weight=2.0,
+                    max_distance=MAX_VECTOR_DISTANCE):
+        """
+        Rank portfolio links for a job's skills.
+
+        Skills listed in the portfolio (or an alias of one) are answered from
+        the skill index; only the rest are embedded in one batch and searched
+        in one query, keeping each skill's top `per_skill` projects within
+        `max_distance`. Scores are combined with reciprocal-rank fusion
+        (score += 1 / (rrf_k + rank)), so a project that matches several
+        skills ranks above one that matches a single skill. An index match
+        counts as rank 1 times `index_weight`, so an exact skill outweighs a
+        nearest neighbour of a skill the portfolio does not list.
+
+        Returns:
+            Up to `n_results` dicts with `link` and `score`, best first
+        """
+        # "Node" and "Node.js" are the same skill and should only count once
+        unique = {}
+        for skill in split_skills(skills):
+            unique.setdefault(skill_key(skill), skill)
+        skills = list(unique.values())
+        if not skills:
+            return []
+
+        with trace.span("match", skills=len(skills)) as stage:
+            scores = {}
+            unknown = []
+            for skill in skills:
+                links = self.skill_index.lookup(skill)
+                if not links:
+                    unknown.append(skill)
+                for link in links:
+                    scores[link] = scores.get(link, 0.0) + index_weight / (rrf_k + 1)
+
+            count = self.collection.count() if unknown else 0
+            if count:
+                embeddings = self.embedding_function(unknown)
+                results = self.collection.query(query_embeddings=embeddings, n_results=min(per_skill, count),
+                                                include=["metadatas", "distances"])
+                for metadatas, distances in zip(results.get('metadatas') or [], results.get('distances') or []):
+                    for rank, (metadata, distance) in enumerate(zip(metadatas, distances), start=1):
+                        link = metadata.get("links")
+                        if link and distance <= max_distance:
+                            scores[link] = scores.get(link, 0.0) + 1.0 / (rrf_k + rank)
+            stage.set(vector=len(unknown) if count else 0)
+        trace.inc("cmg_skill_lookups_total", len(skills) - len(unknown), source="index")
+        trace.inc("cmg_skill_lookups_total", len(unknown), source="vector")
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [{"link": link, "score": round(score, 6)} for link, score in ranked]
+
+    def query_links(self, skills, n_results=3):
+        """Ranked, de-duplicated portfolio links for the given skills"""
+        return [match["link"] for match in self.match_links(skills, n_results=n_results)]
+
+    async def aquery_links(self, skills, n_results=3):
+        """
+        `query_links` for asyncio. Skills in the skill index are answered
+        inline; anything that needs the embedding model and chromadb runs on
+        a worker thread so the event loop is not blocked.
+        """
+        if all(skill in self.skill_index for skill in split_skills(skills)):
+            return self.query_links(skills, n_results)
+        return await asyncio.to_thread(self.query_links, skills, n_results)
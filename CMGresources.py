@@ -0,0 +1,108 @@
+import os
+import threading
+
+# Streamlit re-executes the page script on every interaction but keeps
+# imported modules in sys.modules, so state held here is built once per
+# process and shared by every session and rerun.
+_lock = threading.Lock()
+_chain = None
+_fetcher = None
+_embedding_function = None
+_store = None
+_portfolios = {}
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_chain():
+    """Return the process-wide Chain, creating it on first use"""
+    global _chain
+    if _chain is None:
+        with _lock:
+            if _chain is None:
+                from CMGchain import Chain
+                _chain = Chain()
+    return _chain
+
+
+class LazyChain:
+    """
+    Stands in for the process-wide Chain and only creates it when one of
+    its attributes is used, so a page answered by JSON-LD or the rules never
+    loads the Groq client
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_chain(), name)
+
+
+def get_fetcher():
+    """Return the process-wide PageFetcher, so its connection pool is reused"""
+    global _fetcher
+    if _fetcher is None:
+        with _lock:
+            if _fetcher is None:
+                from CMGfetch import PageFetcher
+                _fetcher = PageFetcher()
+    return _fetcher
+
+
+def get_store():
+    """Return the process-wide JobStore of extracted jobs and generated emails"""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                from CMGstore import JobStore
+                _store = JobStore()
+    return _store
+
+
+def get_embedding_function():
+    """Return the process-wide embedding function, loading and warming up its model on first use"""
+    global _embedding_function
+    if _embedding_function is None:
+        with _lock:
+            if _embedding_function is None:
+                from CMGembeddings import CachedEmbeddingFunction
+                _embedding_function = CachedEmbeddingFunction.from_env().warm_up()
+    return _embedding_function
+
+
+def get_portfolio(csv_path):
+    """
+    Return the process-wide Portfolio for `csv_path`.
+
+    The instance is rebuilt when the CSV's modification time or size
+    changes, so edits to the portfolio are picked up on the next rerun.
+    """
+    path = os.path.abspath(csv_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    signature = _file_signature(path)
+    cached = _portfolios.get(path)
+    if cached is None or cached[0] != signature:
+        # Loaded outside the lock, which get_embedding_function takes itself
+        embedding_function = get_embedding_function()
+        with _lock:
+            cached = _portfolios.get(path)
+            if cached is None or cached[0] != signature:
+                from CMGportfolio import Portfolio
+                cached = (signature, Portfolio(path, embedding_function=embedding_function))
+                _portfolios[path] = cached
+    return cached[1]
+
+
+def clear():
+    """Drop every shared resource so the next call rebuilds it"""
+    global _chain, _fetcher, _embedding_function, _store
+    with _lock:
+        _chain = None
+        _fetcher = None
+        _embedding_function = None
+        _store = None
+        _portfolios.clear()
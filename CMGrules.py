@@ -0,0 +1,191 @@
+import os
+import re
+
+from CMGskills import SkillMatcher
+
+NOT_SPECIFIED = "Not specified"
+# Pages whose rule-based extraction scores at least this much skip the LLM
+MIN_CONFIDENCE = float(os.getenv("CMG_RULES_MIN_CONFIDENCE", 0.75))
+
+ROLE_NOUN_RE = re.compile(
+    r"\b(analyst|engineer|developer|scientist|manager|designer|intern|architect|consultant|specialist|"
+    r"administrator|lead|director|researcher|programmer|technician|coordinator|strategist)\b",
+    re.I,
+)
+SECTION_RE = re.compile(
+    r"^(?P<requirements>requirements|qualifications|minimum qualifications|basic qualifications|"
+    r"what you(?:'ll| will)? bring|what we(?:'re| are) looking for|who you are|must[- ]haves?|you have|"
+    r"skills(?: and experience)?)"
+    r"|(?P<preferred>nice[- ]to[- ]haves?|preferred(?: qualifications| skills)?|bonus(?: points)?|pluses)"
+    r"|(?P<description>about the (?:role|job|position)|the role|your role|responsibilities|"
+    r"key responsibilities|what you(?:'ll| will) do|duties|your impact)"
+    r"|(?P<other>benefits|perks|what we offer|about us|about the company|how to apply|similar jobs|"
+    r"equal opportunity.*|share this job)$",
+    re.I,
+)
+CLAUSE_RE = re.compile(r"(?<=[;.!?])\s+")
+PREFERRED_LINE_RE = re.compile(r"\b(is a plus|a plus|nice to have|preferred|bonus|desirable)\b", re.I)
+EXPERIENCE_RES = [
+    (re.compile(r"\b(\d{1,2})\s*(?:-|–|—|to)\s*(\d{1,2})\+?\s*(?:years?|yrs?)\b", re.I), "{0}-{1} years"),
+    (re.compile(r"\b(\d{1,2})\s*\+\s*(?:years?|yrs?)\b", re.I), "{0}+ years"),
+    (re.compile(r"\b(?:at least|minimum(?: of)?|min\.?)\s*(\d{1,2})\s*(?:years?|yrs?)\b", re.I), "{0}+ years"),
+    (re.compile(r"\b(\d{1,2})\s*(?:years?|yrs?)\s+(?:of\s+)?(?:[\w-]+\s+){0,3}?experience\b", re.I), "{0} years"),
+]
+LEVEL_EXPERIENCE = [
+    (re.compile(r"\b(intern|internship|trainee|placement)\b", re.I), "Internship"),
+    (re.compile(r"\b(entry[- ]level|graduate|fresher|no experience required)\b", re.I), "Entry level"),
+]
+# Names use [ \t] rather than \s so a match never runs across lines
+COMPANY_RES = [
+    re.compile(r"\b([A-Z][\w&'-]*(?:[ \t]+[A-Z][\w&'-]*){0,3},?[ \t]+(?:Inc|LLC|Ltd|GmbH|Corp|Corporation|Limited|"
+               r"PLC|plc|AG|S\.A|B\.V)\b\.?)"),
+    re.compile(r"^(?:About|Join|Working at)[ \t]+([A-Z][\w&'-]*(?:[ \t]+[A-Z][\w&'-]*){0,3})$", re.M),
+]
+# "Contoso is hiring ..." style sentences; only tried when the patterns above find nothing,
+# and too easily fooled ("Training is provided ...") to count towards the confidence
+COMPANY_SENTENCE_RE = re.compile(
+    r"(?:^|[.!?][ \t]+)([A-Z][\w&'-]*(?:[ \t]+[A-Z][\w&'-]*){0,3})[ \t]+(?:is (?:a|an|the|one of|looking for|hiring)|"
+    r"are (?:a|an|the|looking for|hiring)|helps|builds|makes|powers|was founded|has been)\b", re.M)
+# Capitalized words that start sentences but are never company names
+_NOT_COMPANIES = {"we", "you", "our", "this", "the", "it", "as", "they", "there", "here", "that", "what", "who",
+                  "your", "a", "an", "if", "all", "each", "every", "experience"}
+_TITLE_SMALL_WORDS = {"of", "and", "for", "the", "in", "to", "a", "an", "with", "or", "&", "-", "/", "on", "at"}
+MAX_DESCRIPTION_CHARS = 1200
+
+_matcher = SkillMatcher.default()
+
+
+def _is_title(line):
+    """A short Title Case line naming a role, e.g. "Senior Data Analyst" """
+    if len(line) > 80 or line.endswith(('.', ':', '?', '!')) or not ROLE_NOUN_RE.search(line):
+        return False
+    words = line.replace("(", " ").replace(")", " ").split()
+    if not 1 <= len(words) <= 8:
+        return False
+    return all(word[0].isupper() or not word[0].isalpha() or word.lower() in _TITLE_SMALL_WORDS for word in words)
+
+
+def _section(line):
+    match = SECTION_RE.match(line.strip().rstrip(':').strip())
+    return match.lastgroup if match else None
+
+
+def _sentence(line):
+    return line if line.endswith(('.', '!', '?')) else line + '.'
+
+
+def find_experience(text):
+    """Experience requirement such as "5+ years" or "2-4 years", or None"""
+    for pattern, template in EXPERIENCE_RES:
+        match = pattern.search(text)
+        if match:
+            return template.format(*match.groups())
+    return None
+
+
+def _find_company(text, skip=()):
+    # (name, True when a legal suffix or an About/Join heading names it), or (None, False)
+    skip = {s.lower() for s in skip}
+    for pattern in COMPANY_RES + [COMPANY_SENTENCE_RE]:
+        for match in pattern.finditer(text):
+            name = match.group(1).strip().rstrip(',')
+            first = name.split()[0].lower()
+            if first in _NOT_COMPANIES or name.lower() in skip or _matcher.find(name) == [name] \
+                    or ROLE_NOUN_RE.search(name):
+                continue
+            return name, pattern is not COMPANY_SENTENCE_RE
+    return None, False
+
+
+def find_company(text, skip=()):
+    """Best guess at the hiring company's name, or None"""
+    return _find_company(text, skip)[0]
+
+
+def _split_postings(lines):
+    """Group lines into (title, body_lines) per role title, dropping lines before the first title"""
+    postings = []
+    for line in lines:
+        if _is_title(line) and _section(line) is None:
+            postings.append((line, []))
+        elif postings:
+            postings[-1][1].append(line)
+    return postings
+
+
+def _posting_to_job(title, body, company, company_certain=True):
+    sections = {"description": [], "requirements": [], "preferred": [], "other": []}
+    current = "description"
+    for line in body:
+        kind = _section(line)
+        if kind:
+            current = kind
+            continue
+        sections[current].append(line)
+
+    # "Python is a plus" inside the requirements is a preferred skill, not a required one
+    skill_lines, preferred_lines = [], list(sections["preferred"])
+    for line in sections["description"] + sections["requirements"]:
+        for clause in CLAUSE_RE.split(line):
+            (preferred_lines if PREFERRED_LINE_RE.search(clause) else skill_lines).append(clause)
+    skills = _matcher.find("\n".join([title] + skill_lines))
+    preferred = [s for s in _matcher.find("\n".join(preferred_lines)) if s not in skills]
+
+    text = "\n".join([title] + body)
+    experience = find_experience(text)
+    if experience is None:
+        for pattern, label in LEVEL_EXPERIENCE:
+            if pattern.search(title) or pattern.search(text):
+                experience = label
+                break
+
+    description = " ".join(_sentence(line) for line in sections["description"])[:MAX_DESCRIPTION_CHARS]
+    requirements = " ".join(_sentence(line) for line in sections["requirements"])
+
+    # Weights: every posting has a title; skills matter most for portfolio
+    # matching; a labelled requirements section means the page is structured
+    # enough that the rules did not miss much.
+    confidence = 0.3 + 0.3 * min(len(skills), 3) / 3
+    confidence += 0.15 if experience else 0.0
+    confidence += 0.1 if company and company_certain else 0.0
+    confidence += 0.15 if requirements else 0.05 if description else 0.0
+
+    job = {
+        "role": title,
+        "experience": experience,
+        "skills": ", ".join(skills),
+        "description": description,
+        "requirements": requirements,
+        "company_challenges": "",
+        "preferred_skills": ", ".join(preferred),
+        "company_name": company,
+    }
+    return {key: value or NOT_SPECIFIED for key, value in job.items()}, round(confidence, 3)
+
+
+def extract_jobs_by_rules(text):
+    """
+    Extract job postings from page text without calling the LLM.
+
+    `text` is the newline-separated main text from `extract_page`; the line
+    structure is what lets titles and section headings be recognized, so
+    it should not be run through clean_text first. Each line that looks like
+    a role title starts a posting. Skills come from the vocabulary matcher,
+    experience from range regexes and the company from a few phrasings.
+
+    Returns:
+        (jobs, confidence) where confidence is the lowest per-posting score
+        in [0, 1], and 0 when no posting was found
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    postings = _split_postings(lines)
+    if not postings:
+        return [], 0.0
+
+    company, company_certain = _find_company("\n".join(lines), skip=[title for title, _ in postings])
+    jobs, scores = [], []
+    for title, body in postings:
+        job, score = _posting_to_job(title, body, company, company_certain)
+        jobs.append(job)
+        scores.append(score)
+    return jobs, min(scores)
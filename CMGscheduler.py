@@ -0,0 +1,270 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+import CMGtrace as trace
+from CMGutils import parse_retry_after
+
+# Lower runs first: a user waiting on the page goes ahead of queued batch work
+INTERACTIVE = 0
+BATCH = 1
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `capacity`; may go negative when usage is reconciled"""
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount):
+        """Seconds until `amount` units are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _error_retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    return parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _used_tokens(result):
+    usage = getattr(result, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+class LLMScheduler:
+    """
+    Owns every LLM call made by a Chain.
+
+    Calls are admitted in priority order once a concurrency slot is free
+    and both the requests-per-minute and tokens-per-minute buckets allow
+    them. Token use is estimated up front and corrected from the response's
+    usage metadata. 429s and 5xx errors are retried with exponential
+    backoff, honouring Retry-After, and a 429 pauses admission for every
+    caller until the wait is over.
+
+    Threads and asyncio tasks share the same queue and limits: `run` and
+    `stream` block the calling thread, while `arun` waits on its event loop
+    and is woken when a slot frees up.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=6000, max_concurrency=4,
+                 max_retries=5, backoff=1.0, max_backoff=60.0, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0}
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        # (loop, future) of coroutines waiting for admission, woken on every change
+        self._async_waiters = []
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            requests_per_minute=float(os.getenv("CMG_LLM_RPM", 30)),
+            tokens_per_minute=float(os.getenv("CMG_LLM_TPM", 6000)),
+            max_concurrency=int(os.getenv("CMG_LLM_CONCURRENCY", 4)),
+        )
+
+    def _notify(self):
+        # Called with self._cond held
+        self._cond.notify_all()
+        for loop, future in self._async_waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        self._async_waiters.clear()
+
+    def _admission_wait(self, ticket, tokens):
+        """Seconds until `ticket` may run, None if it must wait for its turn or a slot, 0 to admit it now"""
+        if self._waiting[0] != ticket or self._active >= self.max_concurrency:
+            return None
+        return max(0.0, self._paused_until - self.clock(), self.requests.time_until(1),
+                   self.tokens.time_until(tokens))
+
+    def _admit(self, tokens):
+        heapq.heappop(self._waiting)
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self._active += 1
+        self.stats["calls"] += 1
+
+    def _withdraw(self, ticket):
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+
+    def _acquire(self, priority, tokens):
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = self._admission_wait(ticket, tokens)
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+                self._admit(tokens)
+            except BaseException:
+                self._withdraw(ticket)
+                raise
+            finally:
+                self._notify()
+
+    async def _aacquire(self, priority, tokens):
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._admission_wait(ticket, tokens)
+                    if wait == 0:
+                        self._admit(tokens)
+                        self._notify()
+                        return
+                    future = loop.create_future()
+                    self._async_waiters.append((loop, future))
+                try:
+                    await asyncio.wait_for(future, wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                self._withdraw(ticket)
+                self._notify()
+            raise
+
+    def _release(self, estimated, used=None):
+        with self._cond:
+            self._active -= 1
+            if used is not None:
+                self.tokens.take(used - estimated)
+            self._notify()
+
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying `error`, or None if it should not be retried"""
+        status = _status_code(error)
+        if attempt >= self.max_retries or status is None or not (status == 429 or status >= 500):
+            return None
+        delay = _error_retry_after(error)
+        if delay is None:
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        delay = min(delay, self.max_backoff)
+        with self._cond:
+            self.stats["retries"] += 1
+            if status == 429:
+                self.stats["rate_limited"] += 1
+                self._paused_until = max(self._paused_until, self.clock() + delay)
+        trace.inc("cmg_retries_total", source="llm", reason="rate_limited" if status == 429 else "server_error")
+        return delay
+
+    def run(self, call, priority=INTERACTIVE, tokens=0):
+        """Run `call()` under the scheduler's limits, retrying rate limits and server errors"""
+        for attempt in itertools.count():
+            # Time spent queued for a slot or a rate limit, apart from the call itself
+            with trace.span("llm_wait", attempt=attempt):
+                self._acquire(priority, tokens)
+            try:
+                with trace.span("llm_call", attempt=attempt):
+                    result = call()
+            except Exception as e:
+                self._release(tokens)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                continue
+            self._release(tokens, _used_tokens(result))
+            return result
+
+    async def arun(self, acall, priority=INTERACTIVE, tokens=0):
+        """Await `acall()` under the scheduler's limits without blocking the event loop; retries like `run`"""
+        for attempt in itertools.count():
+            with trace.span("llm_wait", attempt=attempt):
+                await self._aacquire(priority, tokens)
+            try:
+                with trace.span("llm_call", attempt=attempt):
+                    result = await acall()
+            except Exception as e:
+                self._release(tokens)
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled while the call was in flight
+                self._release(tokens)
+                raise
+            self._release(tokens, _used_tokens(result))
+            return result
+
+    def stream(self, make_stream, priority=INTERACTIVE, tokens=0):
+        """
+        Iterate `make_stream()` under the scheduler's limits
+
+        A failure before the first chunk is retried like `run`; once chunks
+        have been yielded the error is raised to the caller.
+        """
+        for attempt in itertools.count():
+            with trace.span("llm_wait", attempt=attempt):
+                self._acquire(priority, tokens)
+            started = False
+            used = None
+            try:
+                for chunk in make_stream():
+                    started = True
+                    used = _used_tokens(chunk) or used
+                    yield chunk
+            except Exception as e:
+                self._release(tokens)
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                continue
+            except BaseException:
+                self._release(tokens)
+                raise
+            self._release(tokens, used)
+            return
@@ -0,0 +1,259 @@
+"""
+Small ASGI service that serves generation from another process.
+
+    python CMGservice.py --port 8000        (or: uvicorn CMGservice:app)
+
+    POST /extract   {"url": ...} or {"html": ...}            -> {"jobs": [...]}
+    POST /email     {"job": {...} or "text", "links": [...]}  -> {"email": ..., "links": [...]}
+    POST /generate  {"url": ...} or {"html": ...}            -> {"results": [{"job", "links", "email"}]}
+    GET  /metrics   Prometheus text (see CMGtrace)
+    GET  /health
+
+Requests run on the event loop through the async Chain API, so a request
+waiting on the LLM holds no thread. Identical requests that arrive while
+one is in flight are coalesced: they await the same result instead of
+calling the LLM again. Set `"use_cache": false` in a body to bypass the
+response cache.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+
+import CMGtrace as trace
+
+DEFAULT_PORTFOLIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Resource", "my_portfolio.csv")
+# Largest request body accepted (HTML pages can be big)
+MAX_BODY_BYTES = int(os.getenv("CMG_SERVICE_MAX_BODY", 5 * 1024 * 1024))
+# Bodies larger than this are decoded and hashed on a worker thread instead of the event loop
+INLINE_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Coalescer:
+    """
+    Runs at most one coroutine per key at a time.
+
+    Callers that ask for a key while it is running await the same task, so
+    concurrent identical requests cost one upstream call. The task is
+    shielded: a caller that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            trace.inc("cmg_coalesced_requests_total")
+        return await asyncio.shield(task)
+
+
+def _request_key(path, body):
+    payload = json.dumps([path, body], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _decode_body(path, data):
+    # (body dict, coalescing key) for a raw request body
+    try:
+        body = json.loads(data or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Body is not valid JSON")
+    if not isinstance(body, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    return body, _request_key(path, body)
+
+
+class Service:
+    """
+    The ASGI application. Chain, portfolio, fetcher and clean_text default to
+    the process-wide instances from CMGresources, created on first use;
+    `portfolio_csv=None` skips link matching.
+    """
+
+    def __init__(self, chain=None, portfolio=None, fetcher=None, clean_text=None,
+                 portfolio_csv=DEFAULT_PORTFOLIO):
+        self._chain = chain
+        self._portfolio = portfolio
+        self._fetcher = fetcher
+        self._clean_text = clean_text
+        self.portfolio_csv = portfolio_csv
+        self.coalescer = Coalescer()
+        self.routes = {
+            ("POST", "/extract"): self.extract,
+            ("POST", "/email"): self.email,
+            ("POST", "/generate"): self.generate,
+        }
+
+    @property
+    def chain(self):
+        if self._chain is None:
+            from CMGresources import get_chain
+            self._chain = get_chain()
+        return self._chain
+
+    @property
+    def clean_text(self):
+        if self._clean_text is None:
+            from CMGutils import clean_text
+            self._clean_text = clean_text
+        return self._clean_text
+
+    async def portfolio(self):
+        if self._portfolio is None and self.portfolio_csv is not None:
+            from CMGresources import get_portfolio
+            # The first call loads the embedding model; keep that off the event loop
+            self._portfolio = await asyncio.to_thread(get_portfolio, self.portfolio_csv)
+            await asyncio.to_thread(self._portfolio.load_portfolio)
+        return self._portfolio
+
+    async def _page(self, body):
+        if body.get("html"):
+            return body["html"]
+        if not body.get("url"):
+            raise HTTPError(400, "Body needs a `url` or `html`")
+        if self._fetcher is None:
+            from CMGresources import get_fetcher
+            self._fetcher = get_fetcher()
+        try:
+            return await asyncio.to_thread(self._fetcher.fetch, body["url"])
+        except Exception as e:
+            raise HTTPError(502, f"Fetch failed: {e}")
+
+    async def _links(self, job, body):
+        if body.get("links") is not None:
+            return list(body["links"])
+        portfolio = await self.portfolio()
+        if portfolio is None or not isinstance(job, dict):
+            return None
+        from CMGskills import split_skills
+        return await portfolio.aquery_links(split_skills(job.get("skills") or []))
+
+    async def _jobs(self, body):
+        from CMGextract import aload_jobs
+
+        html = await self._page(body)
+        return await aload_jobs(html, self.chain, self.clean_text, use_cache=body.get("use_cache", True))
+
+    async def extract(self, body):
+        return {"jobs": await self._jobs(body)}
+
+    async def email(self, body):
+        job = body.get("job")
+        if not job:
+            raise HTTPError(400, "Body needs a `job` dict or description")
+        links = await self._links(job, body)
+        email = await self.chain.awrite_mail(job, links, use_cache=body.get("use_cache", True))
+        return {"email": email, "links": links}
+
+    async def generate(self, body):
+        jobs = await self._jobs(body)
+
+        async def one(job):
+            links = await self._links(job, {})
+            return {"job": job, "links": links,
+                    "email": await self.chain.awrite_mail(job, links, use_cache=body.get("use_cache", True))}
+
+        # The emails for a page's jobs are written concurrently
+        return {"results": list(await asyncio.gather(*(one(job) for job in jobs)))}
+
+    async def _read_body(self, receive, path):
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise HTTPError(499, "Client disconnected")
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body too large")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        data = b"".join(chunks)
+        if size > INLINE_BODY_BYTES:
+            return await asyncio.to_thread(_decode_body, path, data)
+        return _decode_body(path, data)
+
+    async def _send(self, send, status, payload, content_type="application/json", headers=()):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type.encode()),
+                                (b"content-length", str(len(data)).encode()), *headers]})
+        await send({"type": "http.response.body", "body": data})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if method == "GET" and path == "/health":
+            return await self._send(send, 200, {"status": "ok", "in_flight": len(self.coalescer)})
+        if method == "GET" and path == "/metrics":
+            return await self._send(send, 200, trace.render_prometheus().encode("utf-8"),
+                                    "text/plain; version=0.0.4; charset=utf-8")
+
+        handler = self.routes.get((method, path))
+        with trace.request():
+            headers = []
+            if trace.current_request_id():
+                headers.append((b"x-request-id", trace.current_request_id().encode()))
+            try:
+                if handler is None:
+                    allowed = any(route_path == path for _, route_path in self.routes)
+                    raise HTTPError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+                body, key = await self._read_body(receive, path)
+                result = await self.coalescer.run(key, lambda: handler(body))
+            except HTTPError as e:
+                return await self._send(send, e.status, {"error": str(e)}, headers=headers)
+            except Exception as e:
+                return await self._send(send, 500, {"error": str(e)}, headers=headers)
+            await self._send(send, 200, result, headers=headers)
+
+
+app = Service()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the cold email pipeline over HTTP (ASGI)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-portfolio", action="store_true", help="Skip portfolio link matching")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    service = Service(portfolio_csv=None) if args.no_portfolio else app
+    uvicorn.run(service, host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
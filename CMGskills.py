@@ -0,0 +1,204 @@
+import re
+from collections import deque
+
+# Common spellings mapped to the canonical skill name. Keys and values go
+# through the same compaction as every lookup, so case, spaces, dots and
+# dashes do not need separate entries ("Node JS", "node-js", "NodeJS").
+SKILL_ALIASES = {
+    "node": "Node.js",
+    "express": "Express.js",
+    "js": "JavaScript",
+    "ecmascript": "JavaScript",
+    "es6": "JavaScript",
+    "ts": "TypeScript",
+    "react.js": "React",
+    "vue": "Vue.js",
+    "angular.js": "Angular",
+    "next": "Next.js",
+    "py": "Python",
+    "python3": "Python",
+    "golang": "Go",
+    "postgres": "PostgreSQL",
+    "psql": "PostgreSQL",
+    "mongo": "MongoDB",
+    "mssql": "SQL Server",
+    "microsoft sql server": "SQL Server",
+    "rails": "Ruby on Rails",
+    "ror": "Ruby on Rails",
+    "dotnet": ".NET",
+    "asp.net": ".NET",
+    ".net core": ".NET",
+    "c sharp": "C#",
+    "csharp": "C#",
+    "cpp": "C++",
+    "spring": "Spring Boot",
+    "k8s": "Kubernetes",
+    "ml": "Machine Learning",
+    "tf": "TensorFlow",
+    "sklearn": "scikit-learn",
+    "amazon web services": "AWS",
+    "google cloud": "GCP",
+    "google cloud platform": "GCP",
+    "microsoft azure": "Azure",
+    "ci/cd": "DevOps",
+    "full stack": "Full-stack",
+    "front end": "Frontend",
+    "back end": "Backend",
+    "wp": "WordPress",
+}
+
+# Vocabulary for finding skills in free text. Kept to names that are
+# unambiguous as words; "Go", "R" or "Swift" would match ordinary prose.
+SKILLS = [
+    "Python", "SQL", "NoSQL", "Java", "JavaScript", "TypeScript", "C#", "C++", "Scala", "Kotlin", "Ruby",
+    "PHP", "Rust", "Golang", "MATLAB", "SAS", "SPSS", "Bash", "PowerShell", "VBA", "DAX",
+    "pandas", "NumPy", "SciPy", "scikit-learn", "TensorFlow", "PyTorch", "Keras", "XGBoost", "LightGBM",
+    "Hugging Face", "LangChain", "OpenCV", "NLP", "Machine Learning", "Deep Learning", "Computer Vision",
+    "Statistics", "Statistical Analysis", "Predictive Modeling", "A/B Testing", "Data Visualization",
+    "ETL", "ELT", "Data Modeling", "Data Warehousing", "Business Intelligence",
+    "Excel", "Power BI", "Tableau", "Looker", "Qlik", "Metabase", "Superset", "Google Analytics",
+    "MySQL", "PostgreSQL", "SQL Server", "Oracle", "SQLite", "MongoDB", "Redis", "Cassandra",
+    "Elasticsearch", "DynamoDB", "BigQuery", "Redshift", "Snowflake", "Databricks", "Azure Synapse",
+    "Spark", "PySpark", "Hadoop", "Hive", "Kafka", "Airflow", "dbt", "Flink", "Informatica", "SSIS",
+    "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "Ansible", "Jenkins", "Git", "GitHub",
+    "GitLab", "Linux", "DevOps", "CI/CD", "REST API", "RESTful", "GraphQL", "Microservices",
+    "React", "React Native", "Angular", "Vue.js", "Next.js", "Node.js", "Express.js", "Django", "Flask",
+    "FastAPI", "Spring Boot", "Ruby on Rails", ".NET", "Laravel", "WordPress", "Magento",
+    "HTML", "CSS", "Tailwind CSS", "jQuery", "Redux", "Flutter", "Xamarin", "Android", "iOS", "Firebase",
+    "Jira", "Confluence", "Agile", "Scrum", "Salesforce", "SAP",
+]
+
+# Aliases too short or too common to find in prose ("next steps", "in the spring")
+_AMBIGUOUS_ALIASES = {"js", "ts", "py", "ml", "tf", "wp", "next", "spring", "express", "node", "rails",
+                      "vue", "mongo", "ror", "ci/cd"}
+
+_COMPACT_RE = re.compile(r"[\s.\-_/]+")
+
+
+def _compact(skill):
+    return _COMPACT_RE.sub("", skill.strip().lower())
+
+
+_ALIAS_KEYS = {_compact(alias): _compact(canonical) for alias, canonical in SKILL_ALIASES.items()}
+
+
+def skill_key(skill):
+    """Lookup key for a skill: case, spacing and punctuation folded, aliases resolved"""
+    key = _compact(skill)
+    return _ALIAS_KEYS.get(key, key)
+
+
+def split_skills(skills):
+    """
+    Non-empty, stripped skills from a comma-separated string or an iterable,
+    without the "Not specified" placeholder extraction fills missing fields with
+    """
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    return [s.strip() for s in skills if s and s.strip() and s.strip().lower() != "not specified"]
+
+
+class SkillMatcher:
+    """
+    Finds every vocabulary skill in a text in one pass (Aho-Corasick).
+
+    Matching is case-insensitive and only counts whole words, so "Java" is
+    not found inside "JavaScript". Where matches overlap the longest wins
+    ("SQL Server" over "SQL"). Patterns map to the canonical name returned.
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, canonical in patterns.items():
+            node = 0
+            for ch in pattern.lower():
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), canonical))
+
+        # Breadth-first so each node's failure link is final before its children use it
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    @classmethod
+    def default(cls):
+        patterns = {skill: skill for skill in SKILLS}
+        for alias, canonical in SKILL_ALIASES.items():
+            if alias not in _AMBIGUOUS_ALIASES:
+                patterns.setdefault(alias, canonical)
+        return cls(patterns)
+
+    def find(self, text):
+        """Canonical names of the skills in `text`, in order of first appearance"""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, canonical in out[node]:
+                start = end - length + 1
+                if (start == 0 or not text[start - 1].isalnum()) and \
+                        (end + 1 == len(text) or not text[end + 1].isalnum()):
+                    matches.append((start, -length, canonical))
+
+        found = []
+        covered = 0
+        for start, neg_length, canonical in sorted(matches):
+            if start >= covered:
+                found.append(canonical)
+                covered = start - neg_length
+        return list(dict.fromkeys(found))
+
+
+class SkillIndex:
+    """
+    Inverted index from normalized skill to the portfolio links that list it.
+
+    Built from the `Techstack` and `Links` columns, so skills that appear in
+    the portfolio (or an alias of one) are answered with dictionary lookups
+    instead of an embedding and a vector query.
+    """
+
+    def __init__(self, techstacks, links):
+        self._links = {}
+        for techstack, link in zip(techstacks, links):
+            if not link:
+                continue
+            for skill in split_skills(techstack):
+                row_links = self._links.setdefault(skill_key(skill), [])
+                if link not in row_links:
+                    row_links.append(link)
+
+    @classmethod
+    def from_frame(cls, data):
+        return cls(data["Techstack"].fillna("").astype(str), data["Links"].fillna("").astype(str))
+
+    def __len__(self):
+        return len(self._links)
+
+    def __contains__(self, skill):
+        return skill_key(skill) in self._links
+
+    def lookup(self, skill):
+        """Links whose tech stack lists `skill`, in CSV order (empty if unknown)"""
+        return self._links.get(skill_key(skill), [])
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from CMGcache import default_cache_dir
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS postings ("
+    " id INTEGER PRIMARY KEY,"
+    " url TEXT NOT NULL,"
+    " content_hash TEXT NOT NULL,"
+    " created_at REAL NOT NULL,"
+    " UNIQUE (url, content_hash))",
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " id INTEGER PRIMARY KEY,"
+    " posting_id INTEGER NOT NULL REFERENCES postings (id) ON DELETE CASCADE,"
+    " position INTEGER NOT NULL,"
+    " role TEXT COLLATE NOCASE,"
+    " company TEXT COLLATE NOCASE,"
+    " experience TEXT,"
+    " data TEXT NOT NULL,"
+    " created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS emails ("
+    " id INTEGER PRIMARY KEY,"
+    " job_id INTEGER NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,"
+    " links TEXT,"
+    " email TEXT NOT NULL,"
+    " created_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_posting ON jobs (posting_id, position)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_company ON jobs (company, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_role ON jobs (role, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_emails_job ON emails (job_id, created_at)",
+]
+
+
+# ORDER BY clauses for query_jobs
+JOB_ORDERS = {"newest": "created_at DESC, id DESC", "position": "position, id"}
+
+
+def _row_to_job(row):
+    job_id, posting_id, role, company, experience, data, created_at = row
+    item = {"id": job_id, "posting_id": posting_id, "role": role, "company": company,
+            "experience": experience, "created_at": created_at}
+    if data is not None:
+        item["job"] = json.loads(data)
+    return item
+
+
+def _like_prefix(value):
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+class JobStore:
+    """
+    Persistent store of fetched postings, the jobs extracted from them and
+    the emails written for those jobs.
+
+    A posting is keyed by its URL and a hash of its content, so a page that
+    has not changed since it was last extracted is answered from the store.
+    Jobs are indexed by company, role and date for the paginated `query_jobs`.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            cache_dir = default_cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "jobs.sqlite3")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def find_posting(self, url, content):
+        """Id of the stored posting for `url` with this exact content, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM postings WHERE url = ? AND content_hash = ?", (url, self.content_hash(content))
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_posting(self, url, content, jobs):
+        """Store the jobs extracted from a posting, replacing any earlier ones for the same content"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO postings (url, content_hash, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (url, content_hash) DO UPDATE SET created_at = excluded.created_at",
+                (url, self.content_hash(content), now)
+            )
+            posting_id = self._conn.execute(
+                "SELECT id FROM postings WHERE url = ? AND content_hash = ?", (url, self.content_hash(content))
+            ).fetchone()[0]
+            existing = dict(self._conn.execute(
+                "SELECT position, id FROM jobs WHERE posting_id = ?", (posting_id,)
+            ).fetchall())
+            # Re-extraction updates jobs in place so their ids, and the emails
+            # written for them, survive
+            for position, job in enumerate(jobs):
+                values = (str(job.get("role", "")), str(job.get("company_name", "")),
+                          str(job.get("experience", "")), json.dumps(job, ensure_ascii=False), now)
+                if position in existing:
+                    self._conn.execute(
+                        "UPDATE jobs SET role = ?, company = ?, experience = ?, data = ?, created_at = ? "
+                        "WHERE id = ?", values + (existing[position],)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT INTO jobs (role, company, experience, data, created_at, posting_id, position) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", values + (posting_id, position)
+                    )
+            self._conn.execute("DELETE FROM jobs WHERE posting_id = ? AND position >= ?", (posting_id, len(jobs)))
+        return posting_id
+
+    def posting_jobs(self, posting_id, include_job=True):
+        """The jobs of one posting, in page order; without `include_job` the JSON `job` is not read"""
+        data = "data" if include_job else "NULL"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, posting_id, role, company, experience, {data}, created_at FROM jobs "
+                "WHERE posting_id = ? ORDER BY position", (posting_id,)
+            ).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def job(self, job_id):
+        """The stored job dict with this id, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_jobs(self, company=None, role=None, posting_id=None, since=None, until=None, page=1, page_size=20,
+                   order="newest"):
+        """
+        Page through stored jobs, newest first (or in page order with `order="position"`).
+
+        `company` and `role` match case-insensitively by prefix, and `since`
+        / `until` bound the extraction time (Unix seconds).
+
+        Returns:
+            Dict with `items` (dicts with id, role, company, experience,
+            created_at and the full `job`), `total`, `page` and `pages`
+        """
+        clauses, params = [], []
+        if company:
+            clauses.append("company LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(company))
+        if role:
+            clauses.append("role LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(role))
+        if posting_id is not None:
+            clauses.append("posting_id = ?")
+            params.append(posting_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        page = max(1, int(page))
+        page_size = max(1, int(page_size))
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM jobs{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT id, posting_id, role, company, experience, data, created_at FROM jobs"
+                f"{where} ORDER BY {JOB_ORDERS[order]} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+        return {"items": [_row_to_job(row) for row in rows], "total": total, "page": page,
+                "pages": max(1, -(-total // page_size))}
+
+    def save_email(self, job_id, email, links=None):
+        """
+        Store an email for a job and return its id. An email already stored
+        for the job with the same links (e.g. a cached answer) is not added
+        again, only marked as the newest.
+        """
+        links = json.dumps(list(links or []))
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM emails WHERE job_id = ? AND email = ? AND links = ?", (job_id, email, links)
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE emails SET created_at = ? WHERE id = ?", (now, row[0]))
+                return row[0]
+            cursor = self._conn.execute(
+                "INSERT INTO emails (job_id, links, email, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, links, email, now)
+            )
+        return cursor.lastrowid
+
+    def emails(self, job_id, limit=10):
+        """Emails written for a job, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, links, email, created_at FROM emails WHERE job_id = ? "
+                "ORDER BY created_at DESC, id DESC LIMIT ?", (job_id, limit)
+            ).fetchall()
+        return [{"id": email_id, "links": json.loads(links or "[]"), "email": email, "created_at": created_at}
+                for email_id, links, email, created_at in rows]
+
+    def stats(self):
+        with self._lock:
+            return {table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("postings", "jobs", "emails")}
@@ -0,0 +1,319 @@
+"""
+Timing spans, counters and histograms for the generation pipeline.
+
+    with trace.request():                # new request id for everything below
+        with trace.span("fetch", host=host):
+            ...
+    trace.inc("cmg_retries_total", source="llm", reason="rate_limited")
+    trace.observe("cmg_llm_latency_seconds", 1.2, kind="email")
+    print(trace.render_prometheus())
+
+Tracing is off unless `CMG_TRACE=1` is set or `enable()` is called. While
+off, `span()` and `request()` return a shared no-op object and `inc()` /
+`observe()` return at once, so instrumented code pays one function call
+and a flag check per site. `request(force=True)` traces just that request
+while the process-wide switch is off (e.g. one Streamlit session's debug
+panel). Request ids and span parents live in contextvars, so concurrent
+requests in threads or asyncio tasks do not mix.
+"""
+import bisect
+import contextvars
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Name -> (type, help) of the metrics the pipeline reports; others are created on first use
+METRICS = {
+    "cmg_stage_seconds": ("histogram", "Time spent in each pipeline stage"),
+    "cmg_stage_errors_total": ("counter", "Pipeline stages that raised an exception"),
+    "cmg_cache_requests_total": ("counter", "Cache lookups by cache and result (hit or miss)"),
+    "cmg_llm_requests_total": ("counter", "LLM requests by kind, including those answered from the cache"),
+    "cmg_llm_tokens_total": ("counter", "LLM tokens by kind and type (prompt or completion)"),
+    "cmg_llm_latency_seconds": ("histogram", "Latency of LLM requests that reached the model"),
+    "cmg_retries_total": ("counter", "Retried calls by source (llm or fetch) and reason"),
+    "cmg_skill_lookups_total": ("counter", "Job skills matched by source (index or vector search)"),
+    "cmg_coalesced_requests_total": ("counter", "Service requests that shared an identical in-flight request"),
+}
+
+_enabled = os.getenv("CMG_TRACE", "").lower() in ("1", "true", "yes")
+_request_id = contextvars.ContextVar("cmg_request_id", default=None)
+_current_span = contextvars.ContextVar("cmg_current_span", default=None)
+# Set inside a `request(force=True)`, so its spans are recorded while tracing is off
+_forced = contextvars.ContextVar("cmg_trace_forced", default=False)
+_span_ids = itertools.count(1)
+_spans = deque(maxlen=int(os.getenv("CMG_TRACE_SPANS", 2000)))
+_lock = threading.Lock()
+_metrics = {}
+_server = None
+
+
+def enabled():
+    return _enabled
+
+
+def enable(flag=True):
+    """Turn tracing on or off for the whole process"""
+    global _enabled
+    _enabled = bool(flag)
+
+
+class _Noop:
+    """Stands in for a span or request while tracing is off"""
+    request_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _Noop()
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_span_ids)
+        self.parent = None
+        self.request_id = None
+
+    def set(self, **attrs):
+        """Attach attributes known only once the stage has run (counts, sizes)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.request_id = _request_id.get()
+        self._token = _current_span.set(self.id)
+        self.wall = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # A span held open across generator yields ends in another context
+            pass
+        error = exc_type.__name__ if exc_type is not None else None
+        _spans.append({"id": self.id, "parent": self.parent, "request_id": self.request_id,
+                       "name": self.name, "start": self.wall, "duration": duration,
+                       "attrs": self.attrs, "error": error})
+        observe("cmg_stage_seconds", duration, stage=self.name)
+        if error:
+            inc("cmg_stage_errors_total", stage=self.name, error=error)
+        return False
+
+
+class _Request:
+    def __init__(self, request_id, force=False):
+        self.request_id = request_id
+        self.force = force
+
+    def __enter__(self):
+        self._tokens = (_request_id.set(self.request_id), _current_span.set(None),
+                        _forced.set(self.force or _forced.get()))
+        return self
+
+    def __exit__(self, *exc):
+        _request_id.reset(self._tokens[0])
+        _current_span.reset(self._tokens[1])
+        _forced.reset(self._tokens[2])
+        return False
+
+
+def new_request_id():
+    """A fresh request id, or None while tracing is off"""
+    return uuid.uuid4().hex[:12] if _enabled else None
+
+
+def request(request_id=None, force=False):
+    """
+    Context manager that tags every span inside it with one request id
+
+    Without `request_id`, a new id is made unless a request is already
+    active, in which case the outer request simply continues. With `force`,
+    the request is traced even while tracing is off for the process.
+    """
+    if not (_enabled or force) or (request_id is None and _request_id.get() is not None):
+        return _NOOP
+    return _Request(request_id or uuid.uuid4().hex[:12], force)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def span(name, **attrs):
+    """Context manager timing one stage; the duration goes to `cmg_stage_seconds{stage=name}`"""
+    if not _enabled and not _forced.get():
+        return _NOOP
+    return Span(name, attrs)
+
+
+class _Metric:
+    def __init__(self, name, kind, help_text="", buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.buckets = buckets
+        # Sorted label pairs -> value (counter) or [bucket counts, sum, count] (histogram)
+        self.series = {}
+
+
+def _metric(name, kind):
+    metric = _metrics.get(name)
+    if metric is None:
+        kind, help_text = METRICS.get(name, (kind, ""))
+        metric = _metrics[name] = _Metric(name, kind, help_text)
+    return metric
+
+
+def inc(name, value=1, **labels):
+    """Add `value` to a counter"""
+    if not _enabled and not _forced.get():
+        return
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        series = _metric(name, "counter").series
+        series[key] = series.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram"""
+    if not _enabled and not _forced.get():
+        return
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        metric = _metric(name, "histogram")
+        series = metric.series.get(key)
+        if series is None:
+            series = metric.series[key] = [[0] * (len(metric.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(metric.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+
+def recent_spans(request_id=None, limit=None):
+    """Finished spans, oldest first, optionally only those of one request"""
+    spans = [s for s in list(_spans) if request_id is None or s["request_id"] == request_id]
+    # Ids are handed out as spans open, so a parent always sorts before its children
+    spans.sort(key=lambda s: s["id"])
+    return spans[-limit:] if limit else spans
+
+
+def format_spans(spans):
+    """One line per span, indented under its parent, e.g. `  write  812.4 ms  attempt=0`"""
+    depths = {}
+    lines = []
+    for s in spans:
+        depth = depths[s["id"]] = depths.get(s["parent"], -1) + 1
+        attrs = " ".join(f"{key}={value}" for key, value in s["attrs"].items())
+        error = f" !{s['error']}" if s["error"] else ""
+        lines.append(f"{'  ' * depth}{s['name']}  {s['duration'] * 1000:.1f} ms  {attrs}{error}".rstrip())
+    return lines
+
+
+def stage_summary():
+    """Per stage: count, total and mean seconds, from the `cmg_stage_seconds` histogram"""
+    with _lock:
+        metric = _metrics.get("cmg_stage_seconds")
+        series = dict(metric.series) if metric else {}
+    summary = {}
+    for key, (_, total, count) in series.items():
+        stage = dict(key).get("stage")
+        summary[stage] = {"count": count, "total": round(total, 4), "mean": round(total / count, 4)}
+    return summary
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for name in sorted(_metrics):
+            metric = _metrics[name]
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key in sorted(metric.series, key=str):
+                value = metric.series[key]
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_labels(key)} {_number(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket in zip(list(metric.buckets) + ["+Inf"], counts):
+                    cumulative += bucket
+                    lines.append(f"{name}_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(key)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Forget every metric and span"""
+    with _lock:
+        _metrics.clear()
+        _spans.clear()
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """
+    Serve `/metrics` for Prometheus on a background thread and turn tracing on
+
+    The port defaults to `CMG_METRICS_PORT`. Safe to call on every Streamlit
+    rerun; the server is only started once per process. Returns the server,
+    or None when no port is configured.
+    """
+    global _server
+    port = port if port is not None else os.getenv("CMG_METRICS_PORT")
+    if port is None or port == "":
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="cmg-metrics", daemon=True).start()
+    enable()
+    return _server
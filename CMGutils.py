@@ -1,16 +1,129 @@
 import re
+import string
+import time
+from email.utils import parsedate_to_datetime
+
+# The URL character class below is the original pattern's
+# (?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|%XX) folded into one set:
+# the range $-_ already covers digits, upper case and most punctuation.
+_TAG_RE = re.compile(r'<[^>]*>')
+_URL_RE = re.compile(r'https?://[!$-_a-z]+')
+# Every ASCII byte except letters, digits and space; non-ASCII is dropped by encode()
+_SPECIAL_BYTES = bytes(
+    c for c in range(128) if chr(c) not in string.ascii_letters + string.digits + ' '
+)
+
+CLEAN_CHUNK_SIZE = 1 << 20
+
+
+def _clean_chunk(text):
+    # Remove HTML tags, then URLs
+    text = _URL_RE.sub('', _TAG_RE.sub('', text))
+    # Remove special characters with a byte-level translate instead of a regex scan
+    text = text.encode('ascii', 'ignore').translate(None, _SPECIAL_BYTES).decode('ascii')
+    # Collapse and trim whitespace
+    return ' '.join(text.split())
+
+
+def _chunk_boundary(text, start, end):
+    """Return the last space in text[start:end] that is outside any HTML tag, or -1"""
+    pos = text.rfind(' ', start, end)
+    while pos > start:
+        tag_open = text.rfind('<', start, pos)
+        if tag_open == -1 or text.find('>', tag_open, pos) != -1:
+            return pos
+        pos = text.rfind(' ', start, tag_open)
+    return -1
+
+
+def iter_clean_text(text, chunk_size=CLEAN_CHUNK_SIZE):
+    """
+    Yield the cleaned text of `text` piece by piece, cleaning about `chunk_size` characters at a time
+
+    Chunks end on a plain space outside any tag, which neither a tag, a URL
+    nor a word can span, so joining the pieces with spaces gives exactly
+    clean_text(text).
+    """
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        boundary = -1
+        while end < len(text):
+            boundary = _chunk_boundary(text, start, end)
+            if boundary != -1:
+                break
+            end += chunk_size
+        if boundary == -1:
+            boundary = len(text)
+        piece = _clean_chunk(text[start:boundary])
+        if piece:
+            yield piece
+        start = boundary + 1
+
 
 def clean_text(text):
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*?>', '', text)
-    # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # Trim leading and trailing whitespace
-    text = text.strip()
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
\ No newline at end of file
+    if len(text) <= CLEAN_CHUNK_SIZE:
+        return _clean_chunk(text)
+    # Clean large pages chunk by chunk so intermediate copies stay small
+    return ' '.join(iter_clean_text(text))
+
+def estimate_tokens(text):
+    # Roughly 4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def trim_to_tokens(text, max_tokens):
+    """Cut text to about `max_tokens` tokens, ending at a sentence or word boundary where one is close"""
+    max_chars = max(0, max_tokens * 4)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    # Prefer a whole sentence if that keeps most of the allowance, else a whole word
+    sentence = max(cut.rfind('. '), cut.rfind('! '), cut.rfind('? '))
+    if sentence >= max_chars * 0.6:
+        return cut[:sentence + 1]
+    space = cut.rfind(' ')
+    if space >= max_chars * 0.6:
+        cut = cut[:space]
+    return cut.rstrip(' ,;:') + '...'
+
+
+def split_text(text, max_tokens=3000, overlap_tokens=100):
+    """Split text into chunks of about `max_tokens` tokens, breaking on spaces, with a small overlap"""
+    max_chars = max(1, max_tokens * 4)
+    overlap_chars = min(max(0, overlap_tokens * 4), max_chars // 2)
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            # Back up to the last space so words are not cut in half
+            space = text.rfind(' ', start + max_chars // 2, end)
+            if space != -1:
+                end = space
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+        next_start = end - overlap_chars
+        if overlap_chars:
+            space = text.find(' ', next_start, end)
+            next_start = space + 1 if space != -1 else next_start
+        start = max(next_start, start + 1)
+    return [chunk for chunk in chunks if chunk]
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,89 @@
+import os
+import re
+
+from CMGskills import SkillMatcher, skill_key, split_skills
+
+# Tone instructions added to the email prompt of each variant
+TONES = {
+    "professional": "Formal and polished: measured language, no exclamation marks.",
+    "warm": "Friendly and personable: show genuine enthusiasm for the team and its mission.",
+    "concise": "Short and direct: three brief paragraphs, every sentence tied to a requirement.",
+    "results": "Results-first: lead with concrete outcomes and numbers from past projects.",
+}
+# Temperatures cycled through when none are given; spread out so variants differ
+VARIANT_TEMPERATURES = (0.4, 0.7, 1.0)
+# Word count an email should land in to get the full length score
+EMAIL_WORDS = (int(os.getenv("CMG_EMAIL_MIN_WORDS", 120)), int(os.getenv("CMG_EMAIL_MAX_WORDS", 250)))
+# How much each check counts towards a variant's score
+SCORE_WEIGHTS = {"length": 0.3, "skills": 0.4, "link": 0.3}
+
+_WORD_RE = re.compile(r"\S+")
+_matcher = None
+
+
+def _skill_matcher():
+    global _matcher
+    if _matcher is None:
+        _matcher = SkillMatcher.default()
+    return _matcher
+
+
+def length_score(email, words=EMAIL_WORDS):
+    """1.0 inside the word budget, falling off linearly below and above it"""
+    low, high = words
+    count = len(_WORD_RE.findall(email))
+    if count < low:
+        return count / low
+    if count > high:
+        return max(0.0, 1 - (count - high) / high)
+    return 1.0
+
+
+def skill_coverage(email, skills):
+    """Share of the job's skills the email mentions, by name or alias (1.0 when the job lists none)"""
+    skills = split_skills(skills or [])
+    if not skills:
+        return 1.0
+    lowered = email.lower()
+    found = {skill_key(skill) for skill in _skill_matcher().find(email)}
+    mentioned = sum(
+        1 for skill in skills
+        if skill_key(skill) in found or re.search(rf"(?<!\w){re.escape(skill.lower())}(?!\w)", lowered)
+    )
+    return mentioned / len(skills)
+
+
+def link_score(email, links):
+    """1.0 if the email contains at least one of the portfolio links"""
+    return 1.0 if any(link and link in email for link in links or []) else 0.0
+
+
+def score_email(email, job, links, words=EMAIL_WORDS, weights=SCORE_WEIGHTS):
+    """
+    Cheap local quality score of a generated email, from 0 to 1
+
+    `links` are the matched project links only: the default portfolio link
+    is in every email's signature, so it says nothing about a variant. With
+    no project links the `link` check is left out and the score is weighted
+    over the other checks.
+
+    Returns:
+        Dict with the weighted `score` and the `length`, `skills` and (when
+        there are project links) `link` checks it is made of
+    """
+    skills = job.get("skills") if isinstance(job, dict) else None
+    parts = {
+        "length": length_score(email, words),
+        "skills": skill_coverage(email, skills),
+    }
+    if links:
+        parts["link"] = link_score(email, links)
+    parts = {name: round(value, 3) for name, value in parts.items()}
+    total = sum(weights[name] for name in parts)
+    parts["score"] = round(sum(weights[name] * parts[name] for name in parts) / total, 3)
+    return parts
+
+
+def rank_variants(variants):
+    """Variants sorted best first by `score`; ties keep their original order"""
+    return sorted(variants, key=lambda variant: variant["score"], reverse=True)
@@ -0,0 +1,99 @@
+"""
+Throughput and peak memory of CMGutils.clean_text against the original
+five-pass implementation, on synthetic career pages from 10 KB to 50 MB.
+
+    python benchmarks/bench_clean_text.py [--sizes 10K,1M,50M] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CMGutils import clean_text  # noqa: E402
+
+
+def legacy_clean_text(text):
+    # The implementation clean_text replaced, kept verbatim for comparison
+    text = re.sub(r'<[^>]*?>', '', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = text.strip()
+    text = ' '.join(text.split())
+    return text
+
+
+BLOCKS = [
+    '<div class="job-card"><h2>Senior Data Analyst</h2>\n',
+    '<p>We are looking for an analyst with 3-5 years of experience in SQL, Python &amp; Tableau.</p>\n',
+    '<a href="https://careers.example.com/jobs/12345?src=board&amp;ref=abc">Apply now</a>\n',
+    '<nav><ul><li><a href="/about">About</a></li><li><a href="/careers">Careers</a></li></ul></nav>\n',
+    '<script>window.dataLayer = window.dataLayer || []; dataLayer.push({"event": "view"});</script>\n',
+    '<footer>© 2024 Example Corp · Privacy · Terms · Cookies</footer>\n',
+    'Plain text with   extra   spaces,\ttabs and punctuation! Visit http://example.org/page.\n',
+]
+
+
+def make_page(size, seed=0):
+    rng = random.Random(seed)
+    parts = ['<html><head><title>Careers</title></head><body>\n']
+    total = len(parts[0])
+    while total < size:
+        block = rng.choice(BLOCKS)
+        parts.append(block)
+        total += len(block)
+    parts.append('</body></html>')
+    return ''.join(parts)[:size]
+
+
+def parse_size(value):
+    units = {'K': 1024, 'M': 1024 * 1024}
+    value = value.strip().upper()
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def measure(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10K,100K,1M,10M,50M')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    header = f"{'size':>8} | {'legacy MB/s':>11} {'legacy peak':>11} | {'new MB/s':>9} {'new peak':>9} | {'speedup':>7}"
+    print(header)
+    print('-' * len(header))
+    for label in args.sizes.split(','):
+        size = parse_size(label)
+        page = make_page(size)
+        if clean_text(page) != legacy_clean_text(page):
+            raise SystemExit(f"Output mismatch at size {label}")
+
+        legacy_time, legacy_peak = measure(legacy_clean_text, page, args.repeat)
+        new_time, new_peak = measure(clean_text, page, args.repeat)
+        mb = size / (1024 * 1024)
+        print(f"{label:>8} | {mb / legacy_time:>11.1f} {legacy_peak / 1e6:>9.1f}MB | "
+              f"{mb / new_time:>9.1f} {new_peak / 1e6:>7.1f}MB | {legacy_time / new_time:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
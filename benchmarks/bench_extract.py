@@ -0,0 +1,70 @@
+"""
+Prompt tokens and parse time per page for the HTML extraction stage, on the
+recorded career pages in Resource/fixtures.
+
+Baseline is what the app sent before: BeautifulSoup's get_text() of the whole
+page (as WebBaseLoader does) run through clean_text. Pages with a schema.org
+JobPosting in JSON-LD need no LLM call at all and count as zero tokens.
+
+    python benchmarks/bench_extract.py [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from CMGextract import extract_page  # noqa: E402
+from CMGutils import clean_text, estimate_tokens  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Resource", "fixtures")
+
+
+def best_time(func, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    header = f"{'fixture':<24} {'baseline tok':>12} {'new tok':>8} {'saved':>6} {'LLM':>4} {'bs4 ms':>7} {'new ms':>7}"
+    print(header)
+    print("-" * len(header))
+    total_before = total_after = skipped = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        before = estimate_tokens(clean_text(BeautifulSoup(html, "html.parser").get_text()))
+        text, jobs = extract_page(html)
+        after = 0 if jobs else estimate_tokens(clean_text(text))
+        skipped += bool(jobs)
+        total_before += before
+        total_after += after
+
+        bs4_ms = best_time(lambda h: BeautifulSoup(h, "html.parser").get_text(), html, args.repeat) * 1000
+        new_ms = best_time(extract_page, html, args.repeat) * 1000
+        print(f"{os.path.basename(path):<24} {before:>12} {after:>8} {1 - after / before:>6.0%} "
+              f"{'no' if jobs else 'yes':>4} {bs4_ms:>7.2f} {new_ms:>7.2f}")
+
+    if paths:
+        print("-" * len(header))
+        print(f"{'total':<24} {total_before:>12} {total_after:>8} {1 - total_after / total_before:>6.0%}   "
+              f"{skipped}/{len(paths)} pages skipped the LLM")
+
+
+if __name__ == "__main__":
+    main()
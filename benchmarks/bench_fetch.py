@@ -0,0 +1,120 @@
+"""
+Cold download vs. conditional revalidation for CMGfetch.PageFetcher, against
+a local stub server that serves ETag/Last-Modified, answers 304 to matching
+conditional requests, adds a fixed latency plus a simulated transfer time for
+full bodies, and fails a share of requests with 503 to exercise the retry path.
+Pages are UTF-8 sent as text/html without a charset, as many servers do.
+
+Checks that every page comes back intact (including its non-ASCII text),
+that the cold pass sees no 304s, that every revalidation is answered by a
+304 and that each injected 503 was retried; exits non-zero otherwise.
+
+    python benchmarks/bench_fetch.py [--pages 20] [--size 500K] [--latency 0.05] [--bandwidth 5M]
+                                     [--error-rate 0.1]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CMGfetch import PageFetcher  # noqa: E402
+
+LAST_MODIFIED = "Wed, 01 May 2024 12:00:00 GMT"
+
+
+def make_handler(body, latency, bandwidth, error_rate, rng, served):
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            if rng.random() < error_rate:
+                served["503"] += 1
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            time.sleep(len(body) / bandwidth)
+            self.wfile.write(body)
+
+    return Handler
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    units = {"K": 1024, "M": 1024 * 1024}
+    return int(float(value[:-1]) * units[value[-1]]) if value[-1] in units else int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--size", default="500K")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--bandwidth", default="5M", help="Simulated bytes per second for full responses")
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    body = (b"<html><body><main><h1>Data Analyst \xe2\x80\x94 Soci\xc3\xa9t\xc3\xa9 G\xc3\xa9n\xc3\xa9rale</h1><p>"
+            + b"SQL Python Tableau " * parse_size(args.size))[:parse_size(args.size)] + b"</p></main></body></html>"
+    served = {"503": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                 make_handler(body, args.latency, parse_size(args.bandwidth), args.error_rate,
+                                              random.Random(0), served))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/job/{i}" for i in range(args.pages)]
+
+    expected = body.decode("utf-8")
+    checks = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fetcher = PageFetcher(cache_dir=cache_dir, min_interval=0, backoff=0.01)
+        for label in ("cold", "revalidate"):
+            before = dict(fetcher.stats)
+            started = time.perf_counter()
+            pages = [fetcher.fetch(url) for url in urls]
+            elapsed = time.perf_counter() - started
+            delta = {key: fetcher.stats[key] - before[key] for key in fetcher.stats}
+            print(f"{label:<11} {elapsed / len(urls) * 1000:>7.1f} ms/page  requests={delta['requests']} "
+                  f"304s={delta['not_modified']} retries={delta['retries']}")
+            checks.append((f"{label}: every page decoded intact", all(page == expected for page in pages)))
+            checks.append((f"{label}: {0 if label == 'cold' else len(urls)} 304s",
+                           delta["not_modified"] == (0 if label == "cold" else len(urls))))
+        checks.append(("every injected 503 retried", fetcher.stats["retries"] == served["503"]))
+    server.shutdown()
+
+    print()
+    for name, passed in checks:
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+    failed = [name for name, passed in checks if not passed]
+    if failed:
+        raise SystemExit(f"{len(failed)} check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
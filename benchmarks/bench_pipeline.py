@@ -0,0 +1,214 @@
+"""
+End-to-end pipeline benchmark that runs fully offline.
+
+Every recorded career page in Resource/fixtures goes through the code the
+app runs: a fetcher that serves the fixtures, CMGextract.load_jobs
+(parse, then JSON-LD, rules or clean + LLM), Portfolio.query_links and
+Chain.write_mail, with the fake LLM from fake_llm.py standing in for Groq
+and a throwaway Chroma collection built from Resource/my_portfolio.csv with
+hashing embeddings. Pages are processed by a pool of workers so throughput
+under concurrency is measured too.
+
+Reports p50/p95/p99 latency per stage and end-to-end, pages and emails per
+second, and LLM call/error counts. With --output the results are saved as
+JSON; pass an earlier result file with --compare to print the change per
+stage.
+
+    python benchmarks/bench_pipeline.py [--iterations 5] [--workers 4] [--latency 0.2]
+        [--tokens-per-second 400] [--error-rate 0.05] [--force-llm] [--trace]
+        [--output after.json] [--compare before.json]
+
+With --trace, CMGtrace is switched on for the run (to measure its overhead)
+and its totals for the sub-stages of extract (parse, rules, clean, LLM)
+are reported with the results.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_query_links import HashEmbedding, percentile  # noqa: E402
+from fake_llm import FakeChatModel  # noqa: E402
+
+from CMGcache import ResponseCache  # noqa: E402
+from CMGchain import Chain  # noqa: E402
+from CMGextract import load_jobs  # noqa: E402
+from CMGportfolio import Portfolio  # noqa: E402
+from CMGrules import MIN_CONFIDENCE  # noqa: E402
+from CMGscheduler import LLMScheduler  # noqa: E402
+from CMGskills import split_skills  # noqa: E402
+from CMGutils import clean_text  # noqa: E402
+import CMGtrace as trace  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "Resource", "fixtures")
+PORTFOLIO_CSV = os.path.join(ROOT, "Resource", "my_portfolio.csv")
+STAGES = ["fetch", "extract", "match", "write"]
+
+
+class FixtureFetcher:
+    """Stands in for CMGfetch.Fetcher, serving recorded pages by URL"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch(self, url):
+        return self.pages[url]
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 6),
+        "p50": round(percentile(values, 50), 6),
+        "p95": round(percentile(values, 95), 6),
+        "p99": round(percentile(values, 99), 6),
+        "max": round(max(values), 6),
+    }
+
+
+def process_page(url, fetcher, chain, portfolio, min_confidence):
+    """Run one page through every stage; returns per-stage seconds and the number of emails"""
+    timings = {}
+    started = time.perf_counter()
+
+    html = fetcher.fetch(url)
+    timings["fetch"] = time.perf_counter() - started
+
+    mark = time.perf_counter()
+    jobs = load_jobs(html, chain, clean_text, min_confidence=min_confidence, use_cache=False)
+    timings["extract"] = time.perf_counter() - mark
+
+    timings["match"] = timings["write"] = 0.0
+    for job in jobs:
+        mark = time.perf_counter()
+        links = portfolio.query_links(split_skills(job.get("skills") or []))
+        timings["match"] += time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        chain.write_mail(job, links, use_cache=False)
+        timings["write"] += time.perf_counter() - mark
+
+    timings["end_to_end"] = time.perf_counter() - started
+    return timings, len(jobs)
+
+
+def compare(current, previous):
+    print(f"\nChange vs previous run ({previous.get('timestamp', '?')}):")
+    for name in STAGES + ["end_to_end"]:
+        before = previous.get("stages", {}).get(name, {})
+        after = current["stages"].get(name, {})
+        cells = []
+        for key in ("p50", "p95", "p99"):
+            if before.get(key) and after.get(key) is not None:
+                cells.append(f"{key} {(after[key] - before[key]) / before[key]:+.1%}")
+        print(f"  {name:<11} {'  '.join(cells) or 'n/a'}")
+    before = previous.get("throughput", {}).get("pages_per_second")
+    if before:
+        after = current["throughput"]["pages_per_second"]
+        print(f"  throughput  {(after - before) / before:+.1%} pages/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--iterations", type=int, default=5, help="Passes over the fixture pages")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=400, help="Fake LLM output rate (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of fake LLM calls that return 429")
+    parser.add_argument("--concurrency", type=int, default=4, help="Scheduler concurrency cap")
+    parser.add_argument("--force-llm", action="store_true", help="Send every page without JSON-LD to the LLM")
+    parser.add_argument("--trace", action="store_true", help="Run with CMGtrace spans and metrics enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Save the results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args(argv)
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages[f"https://fixtures.test/{os.path.basename(path)}"] = f.read()
+    if not pages:
+        parser.error(f"no fixtures in {args.fixtures}")
+    min_confidence = float("inf") if args.force_llm else MIN_CONFIDENCE
+    trace.enable(args.trace)
+
+    llm = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                        error_rate=args.error_rate, retry_after=args.latency, seed=args.seed)
+    scheduler = LLMScheduler(requests_per_minute=100000, tokens_per_minute=1e9,
+                             max_concurrency=args.concurrency, backoff=args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "portfolio.csv")
+        shutil.copy(PORTFOLIO_CSV, csv_path)
+        portfolio = Portfolio(csv_path, vectorstore_path=os.path.join(tmp, "vectorstore"),
+                              embedding_function=HashEmbedding())
+        chain = Chain(llm=llm, scheduler=scheduler,
+                      cache=ResponseCache(path=os.path.join(tmp, "cache.sqlite3"), enabled=False))
+
+        fetcher = FixtureFetcher(pages)
+        work = list(pages) * args.iterations
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(lambda url: process_page(url, fetcher, chain, portfolio, min_confidence),
+                                    work))
+        wall = time.perf_counter() - started
+
+    emails = sum(count for _, count in results)
+    stages = {name: summarize([timings[name] for timings, _ in results]) for name in STAGES + ["end_to_end"]}
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "pages": len(work),
+        "emails": emails,
+        "wall_seconds": round(wall, 4),
+        "throughput": {"pages_per_second": round(len(work) / wall, 3),
+                       "emails_per_second": round(emails / wall, 3)},
+        "stages": stages,
+        "llm": {"calls": llm.calls, "errors": llm.errors, "peak_in_flight": llm.peak_in_flight,
+                "retries": scheduler.stats["retries"]},
+        "usage": chain.usage.summary(),
+    }
+    if args.trace:
+        report["trace"] = trace.stage_summary()
+
+    print(f"{len(work)} pages, {emails} emails in {wall:.2f}s "
+          f"({report['throughput']['pages_per_second']} pages/s, {report['throughput']['emails_per_second']} emails/s)")
+    print(f"{'stage':<11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for name, stats in stages.items():
+        print(f"{name:<11} {stats['p50'] * 1000:>9.2f} {stats['p95'] * 1000:>9.2f} "
+              f"{stats['p99'] * 1000:>9.2f} {stats['mean'] * 1000:>9.2f}")
+    print(f"LLM: {llm.calls} calls, {llm.errors} injected errors, {scheduler.stats['retries']} retries, "
+          f"peak {llm.peak_in_flight} in flight")
+
+    if args.trace:
+        print("extract sub-stages: " + ", ".join(f"{stage} {totals['mean'] * 1000:.2f} ms avg"
+                                                 for stage, totals in sorted(report["trace"].items())
+                                                 if stage in ("parse", "rules", "clean", "extract")))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Portfolio link matching latency for jobs with 5 to 100 skills, against a
+throwaway Chroma collection.
+
+Compares the old call (every skill as a separate query text, nested
+metadata lists back) with Portfolio.match_links (skill-index lookups for
+skills the portfolio lists, one embedding batch and one query for the rest,
+reciprocal-rank fusion into a ranked, de-duplicated list). Skills past the
+first 30 get a numeric suffix, so larger jobs exercise the vector fallback.
+
+    python benchmarks/bench_query_links.py [--projects 500] [--repeat 20] [--hash-embeddings]
+
+--hash-embeddings swaps the model for a deterministic hashing embedding, for
+machines that cannot download Chroma's default model.
+"""
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from chromadb.api.types import EmbeddingFunction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CMGportfolio import Portfolio  # noqa: E402
+
+SKILLS = ["Python", "SQL", "Tableau", "Power BI", "Excel", "pandas", "Airflow", "dbt", "Snowflake", "Spark",
+          "React", "Node.js", "MongoDB", "Django", "MySQL", "PostgreSQL", "Vue.js", "Angular", ".NET", "AWS",
+          "Azure", "GCP", "Docker", "Kubernetes", "TensorFlow", "PyTorch", "scikit-learn", "R", "Looker", "Kafka"]
+
+
+class HashEmbedding(EmbeddingFunction):
+    """Bag-of-words hashing embedding; cheap, deterministic and offline"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in text.lower().replace(",", " ").split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+            norm = np.linalg.norm(vector)
+            vectors.append(vector / norm if norm else vector)
+        return vectors
+
+    @staticmethod
+    def name():
+        return "bench-hash"
+
+    def get_config(self):
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding(config.get("dim", 384))
+
+    def default_space(self):
+        return "cosine"
+
+    def supported_spaces(self):
+        return ["cosine", "l2", "ip"]
+
+
+def make_skills(n, rng):
+    base = [rng.choice(SKILLS) for _ in range(n)]
+    return [f"{skill} {i // len(SKILLS)}" if i >= len(SKILLS) else skill for i, skill in enumerate(base)]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--skills", default="5,10,25,50,100")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--hash-embeddings", action="store_true")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "portfolio.csv")
+        pd.DataFrame({
+            "Techstack": [", ".join(rng.sample(SKILLS, 3)) for _ in range(args.projects)],
+            "Links": [f"https://example.com/project-{i}" for i in range(args.projects)],
+        }).to_csv(csv_path, index=False)
+        portfolio = Portfolio(csv_path, vectorstore_path=os.path.join(tmp, "vectorstore"),
+                              embedding_function=HashEmbedding() if args.hash_embeddings else None)
+
+        print(f"{'skills':>6} | {'old p50 ms':>10} {'old links':>9} | {'new p50 ms':>10} {'new p95 ms':>10} "
+              f"{'new links':>9}")
+        for n in (int(x) for x in args.skills.split(",")):
+            skills = make_skills(n, rng)
+            old_times, new_times = [], []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                old = portfolio.collection.query(query_texts=skills, n_results=2).get("metadatas", [])
+                old_times.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                new = portfolio.match_links(skills)
+                new_times.append(time.perf_counter() - started)
+            old_links = sum(len(m) for m in old)
+            print(f"{n:>6} | {statistics.median(old_times) * 1000:>10.2f} {old_links:>9} | "
+                  f"{statistics.median(new_times) * 1000:>10.2f} {percentile(new_times, 95) * 1000:>10.2f} "
+                  f"{len(new):>9}")
+
+
+if __name__ == "__main__":
+    main()
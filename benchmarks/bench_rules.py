@@ -0,0 +1,93 @@
+"""
+Share of postings extracted without an LLM call, on the recorded career
+pages in Resource/fixtures.
+
+Each page goes through load_jobs as the app runs it: JSON-LD first, then the
+rule-based extractor, then the LLM (the fake model from fake_llm.py, so no
+network is used either way). Prints where each page's jobs came from, the
+rule confidence and the extraction time.
+
+A few short probe postings then check the company name the rules pick up;
+the script exits non-zero if any of them is wrong.
+
+    python benchmarks/bench_rules.py [--min-confidence 0.75]
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_llm import FakeChatModel  # noqa: E402
+
+from CMGcache import ResponseCache  # noqa: E402
+from CMGchain import Chain  # noqa: E402
+from CMGextract import extract_page, load_jobs  # noqa: E402
+from CMGrules import MIN_CONFIDENCE, NOT_SPECIFIED, extract_jobs_by_rules  # noqa: E402
+from CMGutils import clean_text  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(BENCH_DIR), "Resource", "fixtures")
+_REQUIREMENTS = "Requirements\n3+ years of experience with SQL, Python and Tableau."
+# (page text, expected company_name); sentence subjects such as "Training" are not companies
+PROBES = [
+    (f"Data Analyst\nTraining is provided for new hires.\n{_REQUIREMENTS}", NOT_SPECIFIED),
+    (f"Data Analyst\nOnboarding is fully remote.\n{_REQUIREMENTS}", NOT_SPECIFIED),
+    (f"Data Analyst\nContoso Retail is looking for an analyst.\n{_REQUIREMENTS}", "Contoso Retail"),
+    (f"Data Analyst\nJoin Fabrikam\n{_REQUIREMENTS}", "Fabrikam"),
+    (f"Data Analyst\nWork with the finance team at Tailspin Toys Ltd.\n{_REQUIREMENTS}", "Tailspin Toys Ltd."),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    args = parser.parse_args(argv)
+
+    llm = FakeChatModel(latency=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        chain = Chain(llm=llm, cache=ResponseCache(path=os.path.join(tmp, "cache.sqlite3"), enabled=False))
+
+        header = f"{'fixture':<24} {'source':<8} {'jobs':>4} {'confidence':>10} {'ms':>7}"
+        print(header)
+        print("-" * len(header))
+        offline = total = 0
+        for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+            text, json_ld = extract_page(html)
+            _, confidence = extract_jobs_by_rules(text)
+
+            calls = llm.calls
+            started = time.perf_counter()
+            jobs = load_jobs(html, chain, clean_text, min_confidence=args.min_confidence)
+            elapsed = time.perf_counter() - started
+
+            source = "json-ld" if json_ld else "llm" if llm.calls > calls else "rules"
+            total += len(jobs)
+            offline += len(jobs) if source != "llm" else 0
+            print(f"{os.path.basename(path):<24} {source:<8} {len(jobs):>4} {confidence:>10.2f} "
+                  f"{elapsed * 1000:>7.2f}")
+
+    print("-" * len(header))
+    print(f"{offline}/{total} postings ({offline / max(total, 1):.0%}) extracted without an LLM call")
+
+    failures = 0
+    print(f"\n{'probe':<48} {'company':<20} {'confidence':>10}")
+    for text, expected in PROBES:
+        jobs, confidence = extract_jobs_by_rules(text)
+        company = jobs[0]["company_name"] if jobs else None
+        mark = "" if company == expected else f"  expected {expected!r}"
+        failures += bool(mark)
+        print(f"{text.splitlines()[1][:48]:<48} {company!s:<20} {confidence:>10.2f}{mark}")
+    if failures:
+        raise SystemExit(f"{failures} probe(s) picked the wrong company")
+
+
+if __name__ == "__main__":
+    main()
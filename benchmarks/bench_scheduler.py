@@ -0,0 +1,161 @@
+"""
+LLM scheduler under load, using the fake LLM with injected 429s.
+
+  priority     batch email requests are submitted all at once, then a few
+               interactive requests arrive while the batch is running
+  retry-after  one call gets a 429 with Retry-After; a call submitted during
+               the pause must not start before it ends
+  mixed        threaded write_mail and asyncio awrite_mail calls share one
+               scheduler and concurrency cap
+
+Reports completions, retries, the peak number of concurrent LLM calls and
+latency per priority, then checks the scheduler's promises: every request
+completes, the concurrency cap holds, interactive requests finish ahead of
+batch work, 429s are retried and Retry-After pauses every caller. Exits
+non-zero if any check fails.
+
+    python benchmarks/bench_scheduler.py [--batch 40] [--interactive 5] [--error-rate 0.2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeChatModel, FakeRateLimitError  # noqa: E402
+
+from CMGcache import ResponseCache  # noqa: E402
+from CMGchain import Chain  # noqa: E402
+from CMGscheduler import BATCH, INTERACTIVE, LLMScheduler  # noqa: E402
+
+JOB = {"role": "Analyst", "skills": "SQL"}
+
+
+def make_chain(args, tmp, llm):
+    scheduler = LLMScheduler(requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                             max_concurrency=args.concurrency, backoff=args.latency)
+    cache = ResponseCache(path=os.path.join(tmp, "cache.sqlite3"), enabled=False)
+    return Chain(llm=llm, scheduler=scheduler, cache=cache), scheduler
+
+
+def run_priority(args, tmp):
+    llm = FakeChatModel(latency=args.latency, error_rate=args.error_rate, retry_after=args.latency)
+    chain, scheduler = make_chain(args, tmp, llm)
+    latencies = {INTERACTIVE: [], BATCH: []}
+    failures = 0
+
+    def job(i, priority):
+        started = time.perf_counter()
+        chain.write_mail(dict(JOB, role=f"Analyst {i}"), priority=priority)
+        latencies[priority].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.batch + args.interactive) as pool:
+        futures = [pool.submit(job, i, BATCH) for i in range(args.batch)]
+        time.sleep(args.latency * 4)
+        futures += [pool.submit(job, i, INTERACTIVE) for i in range(args.interactive)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                failures += 1
+    elapsed = time.perf_counter() - started
+
+    completed = sum(map(len, latencies.values()))
+    print(f"completed    {completed}/{len(futures)} in {elapsed:.2f}s ({failures} failed)")
+    print(f"llm calls    {llm.calls} ({llm.errors} injected 429s, {scheduler.stats['retries']} retries)")
+    print(f"concurrency  peak {llm.peak_in_flight} (cap {args.concurrency})")
+    for name, priority in (("interactive", INTERACTIVE), ("batch", BATCH)):
+        values = latencies[priority]
+        if values:
+            print(f"{name:<12} p50 {statistics.median(values) * 1000:.0f} ms, max {max(values) * 1000:.0f} ms")
+
+    p50 = {priority: statistics.median(values) if values else float("inf") for priority, values in latencies.items()}
+    return [
+        ("every request completes", failures == 0 and completed == len(futures)),
+        ("peak concurrency within the cap", llm.peak_in_flight <= args.concurrency),
+        ("every injected 429 is retried", scheduler.stats["retries"] >= llm.errors),
+        ("interactive p50 below batch p50", p50[INTERACTIVE] < p50[BATCH]),
+    ]
+
+
+def run_retry_after(pause):
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=1e9, max_concurrency=4, backoff=0.01)
+    starts = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            starts.append(time.monotonic())
+            first = len(starts) == 1
+        if first:
+            raise FakeRateLimitError(retry_after=pause)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(scheduler.run, call)]
+        time.sleep(pause / 4)
+        futures.append(pool.submit(scheduler.run, call))
+        results = [future.result() for future in futures]
+    waited = min(starts[1:]) - starts[0]
+    print(f"retry-after  next call started {waited * 1000:.0f} ms after a 429 asking for {pause * 1000:.0f} ms")
+    return [
+        ("429 calls are retried to completion", results == ["ok", "ok"]),
+        ("Retry-After pauses every caller", waited >= pause * 0.95),
+    ]
+
+
+def run_mixed(args, tmp):
+    llm = FakeChatModel(latency=args.latency)
+    chain, _ = make_chain(args, tmp, llm)
+    count = args.concurrency * 4
+
+    async def async_side():
+        return await asyncio.gather(*(chain.awrite_mail(dict(JOB, role=f"Async {i}"), use_cache=False)
+                                      for i in range(count)))
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        threaded = [pool.submit(chain.write_mail, dict(JOB, role=f"Thread {i}"), use_cache=False)
+                    for i in range(count)]
+        emails = asyncio.run(async_side())
+        emails += [future.result() for future in threaded]
+    print(f"mixed        {len(emails)} thread + async emails, peak {llm.peak_in_flight} (cap {args.concurrency})")
+    return [
+        ("mixed thread/async calls complete", len(emails) == 2 * count and all(emails)),
+        ("mixed thread/async calls share the cap", llm.peak_in_flight <= args.concurrency),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--tpm", type=float, default=600000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checks = run_priority(args, tmp)
+        checks += run_retry_after(max(0.2, args.latency * 4))
+        checks += run_mixed(args, tmp)
+
+    print()
+    for name, passed in checks:
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+    failed = [name for name, passed in checks if not passed]
+    if failed:
+        raise SystemExit(f"{len(failed)} check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
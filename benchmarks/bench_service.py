@@ -0,0 +1,151 @@
+"""
+Load test of the async service (CMGservice) on a single process, offline.
+
+Requests are driven straight into the ASGI app (no sockets) with the fake
+model from fake_llm.py, whose async calls wait on the event loop like a
+real HTTP client. The response cache is off so every request reaches the
+model, and the scheduler's limits are raised so the model latency is the
+only bottleneck.
+
+  scaling     N distinct /email requests with C in flight, for each C in
+              --concurrency; reports requests/s, p50/p95 latency, peak
+              concurrent LLM calls and the process's thread count
+  coalescing  --identical copies of one /email request sent at once;
+              reports how many LLM calls they cost
+  sync        (with --sync) the same load through Chain.write_mail on a
+              thread pool of --threads workers, for comparison
+
+    python benchmarks/bench_service.py [--latency 0.2] [--concurrency 1,8,64,256]
+        [--requests 64] [--identical 100] [--sync --threads 32]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_query_links import percentile  # noqa: E402
+from fake_llm import FakeChatModel  # noqa: E402
+
+from CMGcache import ResponseCache  # noqa: E402
+from CMGchain import Chain  # noqa: E402
+from CMGscheduler import LLMScheduler  # noqa: E402
+from CMGservice import Service  # noqa: E402
+
+
+def make_chain(args, tmp):
+    llm = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    scheduler = LLMScheduler(requests_per_minute=1e7, tokens_per_minute=1e12, max_concurrency=100000)
+    cache = ResponseCache(path=os.path.join(tmp, "cache.sqlite3"), enabled=False)
+    return Chain(llm=llm, scheduler=scheduler, cache=cache), llm
+
+
+def job(i):
+    return {"role": f"Data Analyst {i}", "skills": "Python, SQL, Power BI", "company_name": f"Company {i}"}
+
+
+async def call(app, path, body):
+    """Send one request into the ASGI app; returns (status, seconds)"""
+    payload = json.dumps(body).encode("utf-8")
+    sent = []
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [], "query_string": b""}
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return sent[0]["status"], time.perf_counter() - started
+
+
+async def run_load(app, bodies, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    threads = [threading.active_count()]
+
+    async def one(body):
+        async with limit:
+            result = await call(app, "/email", body)
+            threads.append(threading.active_count())
+            return result
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(body) for body in bodies))
+    return results, time.perf_counter() - started, max(threads)
+
+
+def report(name, results, wall, llm, threads):
+    latencies = [seconds for _, seconds in results]
+    errors = sum(1 for status, _ in results if status != 200)
+    print(f"{name:<18} {len(results) / wall:>9.1f} {percentile(latencies, 50) * 1000:>9.1f} "
+          f"{percentile(latencies, 95) * 1000:>9.1f} {llm.peak_in_flight:>9} {threads:>8} {errors:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Fake LLM output rate (0 = instant)")
+    parser.add_argument("--concurrency", default="1,8,64,256")
+    parser.add_argument("--requests", type=int, default=64,
+                        help="Requests per concurrency level (at least 3x the concurrency)")
+    parser.add_argument("--identical", type=int, default=100)
+    parser.add_argument("--sync", action="store_true", help="Also run the load through the threaded sync API")
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args(argv)
+    levels = [int(value) for value in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'case':<18} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak LLM':>9} {'threads':>8} {'errors':>7}")
+        for concurrency in levels:
+            chain, llm = make_chain(args, tmp)
+            app = Service(chain=chain, portfolio_csv=None)
+            # At least a few rounds per level, so throughput is not just one burst
+            count = max(args.requests, concurrency * 3)
+            bodies = [{"job": job(i), "links": ["https://example.com"]} for i in range(count)]
+            results, wall, threads = asyncio.run(run_load(app, bodies, concurrency))
+            report(f"async c={concurrency}", results, wall, llm, threads)
+
+        chain, llm = make_chain(args, tmp)
+        app = Service(chain=chain, portfolio_csv=None)
+        body = {"job": job(0), "links": ["https://example.com"]}
+        results, wall, threads = asyncio.run(run_load(app, [body] * args.identical, args.identical))
+        report(f"identical x{args.identical}", results, wall, llm, threads)
+        print(f"  {llm.calls} LLM call(s) for {args.identical} identical requests, "
+              f"{app.coalescer.coalesced} coalesced")
+
+        if args.sync:
+            for concurrency in levels:
+                chain, llm = make_chain(args, tmp)
+                count = max(args.requests, concurrency * 3)
+                started = time.perf_counter()
+                threads = []
+
+                def one(i):
+                    t = time.perf_counter()
+                    chain.write_mail(job(i), ["https://example.com"], use_cache=False)
+                    threads.append(threading.active_count())
+                    return 200, time.perf_counter() - t
+
+                with ThreadPoolExecutor(max_workers=min(concurrency, args.threads)) as pool:
+                    results = list(pool.map(one, range(count)))
+                report(f"sync c={concurrency}", results, time.perf_counter() - started, llm, max(threads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Cold-start time of the command-line entry points, each measured in a fresh
+interpreter.
+
+    python benchmarks/bench_startup.py [--repeat 5]
+
+Cases:
+  cli --help         python CMGcli.py --help
+  single email       import the library API and write one email with the
+                     fake model from fake_llm.py (no portfolio matching)
+  extract json-ld    CMGapi.extract_jobs on the JSON-LD fixture with the real
+                     (lazily built) Groq chain; the page needs no LLM, so
+                     the Groq client must not be imported
+  groq client        import the library API and build the real Groq-backed
+                     Chain, as the first LLM call does (no request is sent)
+  eager imports      what the Streamlit entry point loaded before any work
+                     when chromadb and the Groq client were imported at
+                     module level, for comparison
+
+For each case the heavy modules that ended up imported are listed; the
+script exits non-zero if a case imports a module it must not.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+HEAVY = ["streamlit", "chromadb", "langchain_groq", "langchain_community", "sentence_transformers", "pandas"]
+
+REPORT = f"""
+import json, sys
+print(json.dumps([name for name in {HEAVY!r} if name in sys.modules]), file=sys.stderr)
+"""
+
+SINGLE_EMAIL = f"""
+import sys
+sys.path[:0] = [{ROOT!r}, {BENCH_DIR!r}]
+import CMGresources
+from CMGapi import write_email
+from CMGcache import ResponseCache
+from CMGchain import Chain
+from fake_llm import FakeChatModel
+CMGresources._chain = Chain(llm=FakeChatModel(latency=0), cache=ResponseCache(enabled=False))
+write_email({{"role": "Data Analyst", "skills": "Python, SQL", "company_name": "Acme"}}, portfolio_csv=None)
+""" + REPORT
+
+EXTRACT_JSON_LD = f"""
+import sys
+sys.path[:0] = [{ROOT!r}]
+import CMGresources
+from CMGapi import extract_jobs
+
+
+class FixtureFetcher:
+    def fetch(self, url):
+        with open({os.path.join(ROOT, "Resource", "fixtures", "job_jsonld.html")!r}, encoding="utf-8") as f:
+            return f.read()
+
+
+CMGresources._fetcher = FixtureFetcher()
+assert extract_jobs("https://example.com/jobs/1")
+""" + REPORT
+
+GROQ_CLIENT = f"""
+import sys
+sys.path[:0] = [{ROOT!r}]
+from CMGresources import get_chain
+get_chain()
+""" + REPORT
+
+EAGER_IMPORTS = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import streamlit, chromadb, langchain_groq, CMGchain, CMGportfolio
+""" + REPORT
+
+CLI_HELP = f"""
+import sys, io, contextlib, runpy
+sys.path.insert(0, {ROOT!r})
+sys.argv = ["CMGcli.py", "--help"]
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        runpy.run_path({os.path.join(ROOT, "CMGcli.py")!r}, run_name="__main__")
+    except SystemExit:
+        pass
+""" + REPORT
+
+
+def run_case(code, env, cwd):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=cwd)
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr)
+    return elapsed, json.loads(proc.stderr.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # (name, code, heavy modules the case must not import)
+    cases = [
+        ("cli --help", CLI_HELP, HEAVY),
+        ("single email", SINGLE_EMAIL, ["streamlit", "chromadb", "langchain_groq", "sentence_transformers"]),
+        ("extract json-ld", EXTRACT_JSON_LD, ["streamlit", "chromadb", "langchain_groq", "sentence_transformers"]),
+        ("groq client", GROQ_CLIENT, ["streamlit", "chromadb", "sentence_transformers"]),
+        ("eager imports", EAGER_IMPORTS, []),
+    ]
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # The Groq client needs a key to be built; no request is sent
+        env = dict(os.environ, CMG_CACHE_DIR=tmp, GROQ_API_KEY=os.getenv("GROQ_API_KEY") or "bench-placeholder")
+        print(f"{'case':<18} {'p50 s':>7} {'min s':>7}  heavy modules imported")
+        for name, code, forbidden in cases:
+            times, modules = [], []
+            for _ in range(args.repeat):
+                elapsed, modules = run_case(code, env, tmp)
+                times.append(elapsed)
+            print(f"{name:<18} {statistics.median(times):>7.3f} {min(times):>7.3f}  {', '.join(modules) or '-'}")
+            failures += [f"{name} imported {module}" for module in modules if module in forbidden]
+    if failures:
+        raise SystemExit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
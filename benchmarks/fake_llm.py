@@ -0,0 +1,154 @@
+"""
+Deterministic stand-in for ChatGroq so Chain can run without a network or API key.
+
+Extraction prompts get a JSON job posting back and email prompts a short
+email; both are derived from a hash of the prompt, so identical prompts
+give identical answers. Latency, token rate and an injected share of 429
+errors are configurable, and the model tracks how many calls it is
+serving at once. Async calls wait with asyncio.sleep, so they hold no
+thread while "in flight".
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+SKILLS = ["Python", "SQL", "Tableau", "Power BI", "Excel", "pandas", "Airflow", "dbt", "Snowflake", "Spark"]
+ROLES = ["Data Analyst", "Senior Data Analyst", "BI Analyst", "Data Engineer", "Analytics Intern"]
+
+
+class FakeRateLimitError(Exception):
+    """Looks like a provider 429 to CMGscheduler (status_code plus response headers)"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests (injected)")
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers=headers)
+
+
+def _tokens(text):
+    return len(text) // 4 + 1
+
+
+class FakeChatModel(BaseChatModel):
+    model_name: str = "fake-llm"
+    temperature: float = 0
+    latency: float = 0.05
+    tokens_per_second: float = 0.0
+    error_rate: float = 0.0
+    retry_after: Optional[float] = None
+    seed: int = 0
+
+    _rng: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default=None)
+    _in_flight: int = PrivateAttr(default=0)
+    peak_in_flight: int = 0
+    calls: int = 0
+    errors: int = 0
+
+    def model_post_init(self, __context):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def _llm_type(self):
+        return "fake-chat-model"
+
+    def respond(self, prompt):
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        if "VALID JSON" in prompt:
+            skills = [SKILLS[(digest >> (4 * i)) % len(SKILLS)] for i in range(4)]
+            return json.dumps({
+                "role": ROLES[digest % len(ROLES)],
+                "experience": f"{digest % 6}+ years",
+                "skills": ", ".join(dict.fromkeys(skills)),
+                "description": "Build dashboards and reporting for the business.",
+                "requirements": "Strong SQL and communication skills.",
+                "company_challenges": "Not specified",
+                "preferred_skills": "Not specified",
+                "company_name": "Fake Corp",
+            })
+        return ("Subject: Application for the Data Analyst role - Anup\n\nDear Hiring Manager,\n\n"
+                "I am writing to apply for the role. " * 8 + f"\n\nReference {digest % 10000}\n\nBest regards,\nAnup")
+
+    def _admit(self):
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return fail
+
+    def _enter(self):
+        fail = self._admit()
+        time.sleep(self.latency)
+        if fail:
+            self._exit()
+            raise FakeRateLimitError(self.retry_after)
+
+    async def _aenter(self):
+        fail = self._admit()
+        await asyncio.sleep(self.latency)
+        if fail:
+            self._exit()
+            raise FakeRateLimitError(self.retry_after)
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _usage(self, prompt, text):
+        return {"input_tokens": _tokens(prompt), "output_tokens": _tokens(text),
+                "total_tokens": _tokens(prompt) + _tokens(text)}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = "\n".join(str(m.content) for m in messages)
+        self._enter()
+        try:
+            text = self.respond(prompt)
+            if self.tokens_per_second:
+                time.sleep(_tokens(text) / self.tokens_per_second)
+        finally:
+            self._exit()
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Waits on the event loop instead of a thread, like a real async HTTP client
+        prompt = "\n".join(str(m.content) for m in messages)
+        await self._aenter()
+        try:
+            text = self.respond(prompt)
+            if self.tokens_per_second:
+                await asyncio.sleep(_tokens(text) / self.tokens_per_second)
+        finally:
+            self._exit()
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = "\n".join(str(m.content) for m in messages)
+        self._enter()
+        try:
+            text = self.respond(prompt)
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                piece = word if i == 0 else " " + word
+                if self.tokens_per_second:
+                    time.sleep(_tokens(piece) / self.tokens_per_second)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, text)))
+        finally:
+            self._exit()